@@ -1,16 +1,24 @@
 # -*- coding: utf-8 -*-
 import json
+import os
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime
 import io
 import re
+import tempfile
 
+import numpy as np
 import pandas as pd
 import streamlit as st
 from pandas.io.formats.style import Styler
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.utils import get_column_letter
-from openpyxl.styles import Alignment
+from openpyxl.styles import Alignment, Border, Font, Side
+from openpyxl.utils.exceptions import IllegalCharacterError
 
 APP_NAME = "Lefties vs Righties Ryder Cup"
 APP_VERSION = "1.2.12"
@@ -22,6 +30,7 @@ PLAYERS_PATH = "Players/"
 ANONYM_FILE = PLAYERS_PATH + "Anonym.jpg"  # fallback portrét, keď hráč nemá fotku alebo URL neexistuje
 BASE_DIR = Path(__file__).resolve().parent
 PLAYERS_DIR = BASE_DIR / 'Players'
+CACHE_DIR = BASE_DIR / '.cache'  # parquet cache naparsovaného GolfData.xlsx
 
 
 st.set_page_config(
@@ -171,48 +180,32 @@ def classify_device_type(device_label: str, metrics: dict) -> str:
 
 
 # --- UI: odstránenie prázdneho priestoru nad hlavičkou (logo čo najvyššie) ---
-st.markdown(
-    """
-    <style>
-    /* TOP PADDING RESET */
-    [data-testid="stAppViewContainer"] .main .block-container { padding-top: 0rem !important; }
-    [data-testid="stAppViewContainer"] .main { padding-top: 0rem !important; }
-    </style>
-    """,
-    unsafe_allow_html=True,
-)
-
-st.markdown(
-    """
-    <style>
-    /* ===== APP HEADER (MOBILE + DESKTOP) ===== */
-    .app-header-mobile{width:100%; text-align:center; margin: 0.25rem 0 0.35rem;}
-    .app-title-mobile{width:100%; font-weight:900; line-height:1.05; font-size:1.75rem; display:block;}
-    .app-version-mobile{width:100%; color:#666; font-size:0.92rem; margin-top:0.15rem;}
-    .app-header-desktop{display:flex; align-items:center; gap:16px; margin:8px 0 6px;}
-    .app-logo-desktop{height:64px; width:auto; display:block;}
-    .app-title-desktop{font-size:1.75rem; font-weight:800; line-height:1.05; margin:0 0 2px 0;}
-    .app-version-desktop{color:#666; font-size:0.95rem; line-height:1.0; margin:0;}
-    </style>
-    """,
-    unsafe_allow_html=True,
-)
+TOP_PADDING_CSS = r"""
+/* TOP PADDING RESET */
+[data-testid="stAppViewContainer"] .main .block-container { padding-top: 0rem !important; }
+[data-testid="stAppViewContainer"] .main { padding-top: 0rem !important; }
+"""
 
+# --- UI: hlavička aplikácie (mobil + desktop) ---
+HEADER_CSS = r"""
+/* ===== APP HEADER (MOBILE + DESKTOP) ===== */
+.app-header-mobile{width:100%; text-align:center; margin: 0.25rem 0 0.35rem;}
+.app-title-mobile{width:100%; font-weight:900; line-height:1.05; font-size:1.75rem; display:block;}
+.app-version-mobile{width:100%; color:#666; font-size:0.92rem; margin-top:0.15rem;}
+.app-header-desktop{display:flex; align-items:center; gap:16px; margin:8px 0 6px;}
+.app-logo-desktop{height:64px; width:auto; display:block;}
+.app-title-desktop{font-size:1.75rem; font-weight:800; line-height:1.05; margin:0 0 2px 0;}
+.app-version-desktop{color:#666; font-size:0.95rem; line-height:1.0; margin:0;}
+"""
 
 # --- UI: mobile tabuľky nech sa zmestia na šírku (menší font) ---
-st.markdown(
-    """
-    <style>
-    /* MOBILE TABLE FIT */
-    .mobile-fit table { width: 100% !important; table-layout: fixed !important; }
-    .mobile-fit th, .mobile-fit td { padding: 0.20rem 0.25rem !important; }
-    .mobile-fit table { font-size: 0.78rem !important; }
-    .mobile-fit td { word-wrap: break-word; overflow-wrap: anywhere; }
-    </style>
-    """,
-    unsafe_allow_html=True,
-)
-
+MOBILE_FIT_CSS = r"""
+/* MOBILE TABLE FIT */
+.mobile-fit table { width: 100% !important; table-layout: fixed !important; }
+.mobile-fit th, .mobile-fit td { padding: 0.20rem 0.25rem !important; }
+.mobile-fit table { font-size: 0.78rem !important; }
+.mobile-fit td { word-wrap: break-word; overflow-wrap: anywhere; }
+"""
 
 # -- Vlastné štýly INLINE (eliminácia styles.css)  ### REPLACE
 STYLES_INLINE = r"""
@@ -274,12 +267,9 @@ STYLES_INLINE = r"""
   .stats-sortbar [data-testid="stHorizontalBlock"] { overflow-x: auto; }
 }
 """
-st.markdown(f"<style>{STYLES_INLINE}</style>", unsafe_allow_html=True)
 
 # -- Dodatočné štýly: aktívne triediace tlačidlo = tučné + väčšie písmo
-st.markdown(
-    """
-<style>
+SORT_ACTIVE_CSS = r"""
 /***** marker pred tlačidlom *****/
 .marker { display:block; height:0; margin:0; padding:0; }
 /***** Aktívne triediace tlačidlo (robustné selektory) *****/
@@ -290,15 +280,10 @@ st.markdown(
   font-weight: 700 !important;
   font-size: 1.05rem !important; /* zladené s tabuľkou */
 }
-</style>
-""",
-    unsafe_allow_html=True,
-)
+"""
 
 # -- Sticky hlavička (2 riadky) + scroll kontajner 600px
-st.markdown(
-    """
-<style>
+STICKY_TABLE_CSS = r"""
 /* Kontajner so scrollom pre tabuľku štatistík */
 .sticky-table-container {
   max-height: 600px;     /* požadovaná výška viewportu pre tabuľku */
@@ -336,10 +321,7 @@ st.markdown(
   font-weight: 700 !important;
   text-align: center !important;
 }
-</style>
-""",
-    unsafe_allow_html=True,
-)
+"""
 
 SORT_SELECT_CSS = r"""
 /* Kontajner držíme kompaktný – len tak široký, ako je obsah */
@@ -370,7 +352,6 @@ SORT_SELECT_CSS = r"""
   margin-bottom: 0.25rem;
 }
 """
-st.markdown(f"<style>{SORT_SELECT_CSS}</style>", unsafe_allow_html=True)
 
 STATS_FIT_CSS = r"""
 /* Kontajner pre selectbox + tabuľku: nech je tak široký, ako jeho obsah (tabuľka) */
@@ -399,7 +380,18 @@ STATS_FIT_CSS = r"""
   margin-bottom: 0.5rem;
 }
 """
-st.markdown(f"<style>{STATS_FIT_CSS}</style>", unsafe_allow_html=True)
+
+# Všetky štýly jedným <style> blokom – jeden markdown element namiesto ôsmich
+st.markdown(
+    "<style>\n" + "\n".join((
+        TOP_PADDING_CSS, HEADER_CSS, MOBILE_FIT_CSS, STYLES_INLINE,
+        SORT_ACTIVE_CSS, STICKY_TABLE_CSS, SORT_SELECT_CSS, STATS_FIT_CSS,
+    )) + "</style>",
+    unsafe_allow_html=True,
+)
+
+# -- Štatistiky: do tohto počtu riadkov HTML tabuľka zo Styleru (farby tímov), nad ním st.dataframe
+STATS_HTML_MAX_ROWS = 300
 
 # -- Farby tímov
 COLOR_LEFT_BG = "#E6F2FF"  # bledomodrá
@@ -407,24 +399,105 @@ COLOR_RIGHT_BG = "#FCE8E8"  # bledočervená
 # -- URL loga
 RAW_LOGO_URL = "https://raw.githubusercontent.com/Jasen77/lefties-righties/main/Logo/logo.png"
 
+def _xlsx_signature(xlsx_path: str) -> str:
+    """Podpis zdrojového xlsx (mtime + veľkosť) – kľúč pre diskovú cache."""
+    stat = Path(xlsx_path).stat()
+    return f"{stat.st_mtime_ns}_{stat.st_size}"
+
+def _open_excel(xlsx_path: str) -> pd.ExcelFile:
+    """Otvorí workbook cez rýchly calamine engine (Rust), fallback openpyxl."""
+    try:
+        return pd.ExcelFile(xlsx_path, engine="calamine")
+    except (ImportError, ValueError):
+        # python-calamine nie je nainštalovaný / staršia verzia pandas bez calamine.
+        # openpyxl engine v pandas otvára workbook s read_only=True, data_only=True (streamované riadky,
+        # bez plného stromu buniek); vlastný loader cez iter_rows by musel duplikovať typovú inferenciu
+        # pandas (napr. Deň '1.' -> 1.0), preto ho nepoužívame.
+        return pd.ExcelFile(xlsx_path, engine="openpyxl")
+
+def _read_parquet_frame(path: Path) -> pd.DataFrame:
+    """Načíta DF z parquet cache; chýbajúce hodnoty v textových stĺpcoch vráti ako NaN (ako read_excel, nie None)."""
+    df = pd.read_parquet(path)
+    obj_cols = df.select_dtypes(include="object").columns
+    if len(obj_cols):
+        df[obj_cols] = df[obj_cols].where(df[obj_cols].notna(), np.nan)
+    return df
+
+@st.cache_data(show_spinner=False)
+def load_data(xlsx_path: str, sig: str):
+    """
+    Načíta hárky 'Zápasy', 'Turnaje' a 'Hráči' jedným otvorením workbooku.
+    `sig` (podpis xlsx z _xlsx_signature) je súčasť kľúča cache – zmena súboru ju zneplatní.
+    Naparsované dáta sa ukladajú aj do parquet cache (CACHE_DIR) podľa podpisu xlsx,
+    takže studený štart appky nemusí znova parsovať Excel.
+    Chýbajúci hárok 'Hráči' vráti ako prázdny DF.
+    """
+    cache_files = [CACHE_DIR / f"{name}_{sig}.parquet" for name in ("matches", "tournaments", "players")]
+    if all(f.exists() for f in cache_files):
+        try:
+            return tuple(_read_parquet_frame(f) for f in cache_files)
+        except Exception:
+            pass  # poškodená cache -> načítaj znova z xlsx
+
+    with _open_excel(xlsx_path) as xls:
+        wanted = ["Zápasy", "Turnaje"] + (["Hráči"] if "Hráči" in xls.sheet_names else [])
+        sheets = pd.read_excel(xls, sheet_name=wanted)
+    frames = (sheets["Zápasy"], sheets["Turnaje"], sheets.get("Hráči", pd.DataFrame()))
+
+    # Zápis cache je len optimalizácia (napr. read-only FS) – chyby ignorujeme
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        for old in CACHE_DIR.glob("*.parquet"):
+            if old not in cache_files:
+                old.unlink(missing_ok=True)
+        for df, f in zip(frames, cache_files):
+            df.to_parquet(f, index=False, compression="zstd")
+    except Exception:
+        pass
+    return frames
+
+@st.cache_data(show_spinner=False)
+def prepare_matches(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Jednorazová normalizácia hárku 'Zápasy' po načítaní (namiesto konverzií pri každom rerune):
+    Rok -> Int64, Lbody/Rbody -> float64 (NaN = 0), L1..R2 -> orezané mená (prázdne = NaN),
+    Formát, Víťaz -> orezané, categorical (pár hodnôt; NaN ostáva NaN, nie pd.NA).
+    """
+    df = df.copy()
+    if "Rok" in df.columns:
+        df["Rok"] = pd.to_numeric(df["Rok"], errors="coerce").astype("Int64")
+    for col in ("Lbody", "Rbody"):
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0.0).astype(float)
+    for col in ("L1", "L2", "R1", "R2"):
+        if col in df.columns:
+            # object stĺpec s NaN (nie StringDtype/pd.NA) – porovnania `==` tak ostávajú čisto bool
+            names = df[col].astype(str).str.strip().where(df[col].notna())
+            df[col] = names.where(names != "", np.nan)
+    for col in ("Formát", "Víťaz"):
+        if col in df.columns:
+            df[col] = df[col].astype(str).str.strip().where(df[col].notna()).astype("category")
+    return df
+
 @st.cache_data(show_spinner=False)
-def load_data(xlsx_path: str):
-    xls = pd.ExcelFile(xlsx_path, engine="openpyxl")
-    df_matches = pd.read_excel(xls, sheet_name="Zápasy", engine="openpyxl")
-    df_tournaments = pd.read_excel(xls, sheet_name="Turnaje", engine="openpyxl")
-    return df_matches, df_tournaments
+def prepare_tournaments(df: pd.DataFrame) -> pd.DataFrame:
+    """Jednorazová normalizácia hárku 'Turnaje' po načítaní: Rok -> Int64 (helpery ho už nekonvertujú)."""
+    if "Rok" not in df.columns:
+        return df
+    df = df.copy()
+    df["Rok"] = pd.to_numeric(df["Rok"], errors="coerce").astype("Int64")
+    return df
 
 @st.cache_data(show_spinner=False)
-def load_players_sheet(xlsx_path: str) -> pd.DataFrame:
+def prepare_players_sheet(dfp: pd.DataFrame) -> pd.DataFrame:
     """
-    Načíta hárok 'Hráči' s menami a portrétmi.
+    Pripraví hárok 'Hráči' (z load_data) s menami a portrétmi.
     Ošetrí aj variant názvu stĺpca 'Portrét'/'Portret' a z buniek vyextrahuje prvú http(s) URL.
     """
+    if dfp.empty:
+        return pd.DataFrame()
     try:
-        xls = pd.ExcelFile(xlsx_path, engine="openpyxl")
-        if "Hráči" not in xls.sheet_names:
-            return pd.DataFrame()
-        dfp = pd.read_excel(xls, sheet_name="Hráči", engine="openpyxl")
+        dfp = dfp.copy()
 
         # Normalize názvy stĺpcov (niekde býva 'Portret', inde 'Portrét')
         cols = {c: str(c).strip() for c in dfp.columns}
@@ -439,20 +512,14 @@ def load_players_sheet(xlsx_path: str) -> pd.DataFrame:
         if portrait_col is None or "Hráč" not in dfp.columns:
             return pd.DataFrame()  # chýbajú kľúčové stĺpce
 
-        # vytiahni prvú http(s) URL z bunky (ak je tam hypertext/poznámka)
-        def _first_url(v) -> str | None:
-            if pd.isna(v):
-                return None
-            s = str(v)
-            m = re.search(r"https?://\S+", s)
-            return m.group(0).strip(")];,") if m else None
+        # vytiahni prvú http(s) URL z bunky (ak je tam hypertext/poznámka) – jeden vektorový regex
+        raw = dfp[portrait_col].astype("string")
+        urls = raw.str.extract(r"(https?://\S+)", expand=False).str.strip(")];,")
+        # doplň aj relatívne cesty (Players/...) – orezaný obsah bunky
+        urls = urls.fillna(raw.str.strip())
 
         dfp["_portrait_raw"] = dfp[portrait_col]
-        dfp["_portrait_url"] = dfp[portrait_col].apply(_first_url)
-        # doplň aj relatívne cesty (Players/...) na raw github URL
-        dfp["_portrait_url"] = dfp["_portrait_url"].fillna(dfp["_portrait_raw"].apply(lambda v: (str(v).strip() if pd.notna(v) else None)))
-        # _portrait_url ostáva len ako prípadná URL vyextrahovaná z bunky
-        dfp["_portrait_url"] = dfp["_portrait_url"]
+        dfp["_portrait_url"] = urls.astype(object).where(urls.notna(), None)
         # kľúč 'Hráč' nechávame v kanonickom formáte, zhoduje sa s menami v L1/L2/R1/R2
         return dfp[["Hráč", "_portrait_url", "_portrait_raw"]].copy()
     except Exception:
@@ -464,8 +531,10 @@ if not Path(DATA_FILE).exists():
     st.stop()
 
 # -- DÁTA
-df_matches, df_tournaments = load_data(DATA_FILE)
-df_players_sheet = load_players_sheet(DATA_FILE)
+df_matches, df_tournaments, df_players_raw = load_data(DATA_FILE, _xlsx_signature(DATA_FILE))
+df_matches = prepare_matches(df_matches)
+df_tournaments = prepare_tournaments(df_tournaments)
+df_players_sheet = prepare_players_sheet(df_players_raw)
 
 # --- Detekcia prostredia (pre layout hlavičky) ---
 _device, _os_name, _ua = detect_device_os()
@@ -558,15 +627,58 @@ with st.sidebar:
 # Helpers
 # -----------------------------
 
-def _clean_name(x):
-    if pd.isna(x):
-        return None
-    s = str(x).strip()
-    return s if s else None
+@lru_cache(maxsize=8192)
+def _collation_key(s: str, use_locale: bool) -> str:
+    """Triediaci kľúč mena (locale.strxfrm, inak casefold) – memoizovaný, mená hráčov sú malá stabilná množina."""
+    if use_locale:
+        import locale
+        return locale.strxfrm(s)
+    return s.casefold()
+
+
+@lru_cache(maxsize=1)
+def _sk_locale_ok() -> bool:
+    """Nastaví slovenské (resp. české) LC_COLLATE pre abecedné zoradenie – raz za proces (locale je globálne pre proces).
+    Vráti, či sa podarilo; inak sa triedi cez casefold."""
+    import locale
+    for loc in ('sk_SK.UTF-8', 'sk_SK', 'Slovak_Slovakia.1250', 'cs_CZ.UTF-8', 'cs_CZ'):
+        try:
+            locale.setlocale(locale.LC_COLLATE, loc)
+            return True
+        except Exception:
+            pass
+    return False
+
+
+@st.cache_data(show_spinner=False)
+def _name_sort_keys(names: tuple[str, ...], use_locale: bool) -> dict[str, tuple[str, str]]:
+    """Triediace kľúče (priezvisko, celé meno) pre množinu unikátnych mien – spočítané raz
+    pre všetkých hráčov (nie v komparátore) a v cache medzi rerunmi aj zmenami filtra."""
+    out = {}
+    for n in names:
+        if not isinstance(n, str):
+            continue
+        surname = (n.split() or [''])[-1]
+        out[n] = (_collation_key(surname, use_locale), _collation_key(n, use_locale))
+    return out
+
 
+def _lexsort_order(keys: list[tuple[pd.Series, bool]]) -> np.ndarray:
+    """Pozičné poradie pre viacstĺpcové triedenie jedným np.lexsort.
+    keys = [(stĺpec, vzostupne), ...] od primárneho; hodnoty idú cez factorize na celé čísla,
+    chýbajúce hodnoty sú vždy na konci (ako v sort_values)."""
+    arrays = []
+    for col, asc in reversed(keys):
+        codes, uniques = pd.factorize(col, sort=True)
+        n = len(uniques)
+        codes = np.where(codes < 0, n, codes if asc else n - 1 - codes)
+        arrays.append(codes)
+    return np.lexsort(arrays)
 
+
+@lru_cache(maxsize=4096)
 def to_firstname_first(name: str) -> str:
-    """Z 'Priezvisko Meno' urobí 'Meno Priezvisko'."""
+    """Z 'Priezvisko Meno' urobí 'Meno Priezvisko'. Memoizované – tie isté mená sa prevádzajú opakovane."""
     if not isinstance(name, str):
         return name
     parts = name.split()
@@ -579,6 +691,15 @@ def to_firstname_first(name: str) -> str:
 
 
 
+def _fmt(v: float) -> str:
+    """Body: celé číslo bez desatín, inak jedno desatinné miesto."""
+    if pd.isna(v):  # prázdna bunka (NaN) – int() by padol, vrátime text ako pôvodné helpery
+        return str(v)
+    iv = int(v)
+    return str(iv) if v == iv else f"{v:.1f}"
+
+
+@lru_cache(maxsize=4096)
 def short_name_msurname(full_name: str) -> str:
     """Z 'Meno Priezvisko' urobí 'M. Priezvisko'."""
     if not isinstance(full_name, str):
@@ -592,6 +713,7 @@ def short_name_msurname(full_name: str) -> str:
     return (initial + " " + last).strip()
 
 
+@lru_cache(maxsize=4096)
 def short_pair_names(val: str) -> str:
     """Z textu 'Meno1 Priezvisko1, Meno2 Priezvisko2' urobí 'M. Priezvisko1, M. Priezvisko2'."""
     if val is None:
@@ -601,77 +723,98 @@ def short_pair_names(val: str) -> str:
         return s
     parts = [x.strip() for x in s.split(",")]
     return ", ".join(short_name_msurname(x) if x else "" for x in parts)
+
+
+_RE_PAIR_PARENS = re.compile(r"^\((.*)\)$", re.S)
+_RE_PAIR_TRAILING_COMMA = re.compile(r",$")
+_RE_PAIR_SEP = re.compile(r"\s*,\s*")
+
+
+def clean_pair_names(s: pd.Series) -> pd.Series:
+    """Názvy dvojíc z groupby kľúča ('A, B',) / ('A', 'B') -> 'A, B' – vektorovo cez .str."""
+    s = s.map(lambda x: ", ".join(map(str, x)) if isinstance(x, (list, tuple)) else x)
+    return (
+        s.astype(str).str.strip()
+        .str.replace(_RE_PAIR_PARENS, r"\1", regex=True).str.strip()
+        .str.replace(_RE_PAIR_TRAILING_COMMA, "", regex=True).str.strip()
+        .str.strip("'").str.strip('"')
+        .str.replace(_RE_PAIR_SEP, ", ", regex=True)
+    )
+
+
+@st.cache_data(show_spinner=False)
 def players_for_year_pairs_only(df_year: pd.DataFrame):
     """Vracia (lefties, righties) zoznamy hráčov pre daný rok – IBA z L1,L2,R1,R2."""
-    left_set, right_set = set(), set()
-    for _, r in df_year.iterrows():
-        for col in ("L1", "L2"):
-            nm = _clean_name(r.get(col))
-            if nm:
-                left_set.add(nm)
-        for col in ("R1", "R2"):
-            nm = _clean_name(r.get(col))
-            if nm:
-                right_set.add(nm)
-    return (sorted(left_set, key=str.casefold), sorted(right_set, key=str.casefold))
+    def _names(cols: tuple[str, ...]) -> list[str]:
+        # stĺpce strany naraz cez pd.unique (hash v C, bez medzi-Series a Python setu);
+        # mená sú už orezané z prepare_matches (prázdne = NaN)
+        cols = [c for c in cols if c in df_year.columns]
+        if not cols:
+            return []
+        uniq = pd.unique(df_year[cols].to_numpy().ravel())
+        return sorted(uniq[pd.notna(uniq)], key=str.casefold)
+
+    return (_names(("L1", "L2")), _names(("R1", "R2")))
+
+
+def _team_points_by_player(df_year: pd.DataFrame, side: str) -> pd.DataFrame:
+    """Body (sum) a počet zápasov (size) pre hráčov jednej strany – jeden groupby namiesto masky pre každého hráča."""
+    pcols = [c for c in (("L1", "L2") if side == 'L' else ("R1", "R2")) if c in df_year.columns]
+    body_col = 'Lbody' if side == 'L' else 'Rbody'
+    if not pcols:
+        return pd.DataFrame(columns=["sum", "size"])
+    body = df_year[body_col].fillna(0) if body_col in df_year.columns else pd.Series(0.0, index=df_year.index)
+    long = pd.DataFrame({
+        "p": np.concatenate([df_year[c].to_numpy() for c in pcols]),
+        "body": np.tile(body.to_numpy(dtype=float), len(pcols)),
+        "row": np.tile(np.arange(len(df_year)), len(pcols)),
+    }).dropna(subset=["p"])
+    # hráč na oboch slotoch toho istého zápasu sa počíta raz (ako pôvodná maska L1 | L2)
+    long = long.drop_duplicates(subset=["p", "row"])
+    return long.groupby("p")["body"].agg(["sum", "size"])
 
 
+@st.cache_data(show_spinner=False)
 def build_team_table(df_year: pd.DataFrame, players: list[str], side: str) -> pd.DataFrame:
     # Ponechané pre tabuľky v karte Turnaje (nemá vplyv na hlavnú agregáciu v Štatistikách)
-    def compute_player_stats(df_year: pd.DataFrame, player: str, side: str):
-        if side == 'L':
-            mask_pair = ((df_year['L1'] == player) | (df_year['L2'] == player))
-            body_pairs = df_year.loc[mask_pair, 'Lbody'].fillna(0).sum() if 'Lbody' in df_year.columns else 0
-            matches = int(mask_pair.sum())
-        else:
-            mask_pair = ((df_year['R1'] == player) | (df_year['R2'] == player))
-            body_pairs = df_year.loc[mask_pair, 'Rbody'].fillna(0).sum() if 'Rbody' in df_year.columns else 0
-            matches = int(mask_pair.sum())
-        body = float(body_pairs)
-        return body, matches
-
-    def _format_body(val: float) -> str:
-        return f"{int(val)}" if float(val).is_integer() else f"{val:.1f}"
-
-    rows = []
-    for p in players:
-        body, matches = compute_player_stats(df_year, p, side)
-        success = f"{int(round((body / matches) * 100))} %" if matches > 0 else "0 %"
-        display_name = to_firstname_first(p)
-        rows.append({
-            "Por.": None,
-            "Hráč": display_name,
-            "Body": _format_body(body),
-            "Zápasy": matches,
-            "Úspešnosť": success,
-        })
-    df = pd.DataFrame(rows)
-    if not df.empty:
-        df.sort_values("Hráč", key=lambda s: s.str.casefold(), inplace=True)
-        df.reset_index(drop=True, inplace=True)
-        df = df[["Hráč", "Body", "Zápasy", "Úspešnosť"]]
+    if not players:
+        return pd.DataFrame()
+    # stĺpce naraz zo zarovnaného groupby výsledku (bez cyklu a dictu po hráčoch)
+    agg = _team_points_by_player(df_year, side).reindex(players, fill_value=0)
+    body = agg["sum"].to_numpy(dtype=float)
+    matches = agg["size"].to_numpy(dtype=int)
+    pct = np.round(body / np.where(matches > 0, matches, 1) * 100).astype(int)
+    pct[matches == 0] = 0
+
+    df = pd.DataFrame({
+        "Hráč": _vec_firstname_first(pd.Series(players, dtype=object)),
+        "Body": [_fmt(v) for v in body],
+        "Zápasy": matches,
+        "Úspešnosť": np.char.add(pct.astype(str), " %"),
+    })
+    df.sort_values("Hráč", key=lambda s: s.str.casefold(), inplace=True)
+    df.reset_index(drop=True, inplace=True)
     return df
 
 
-def style_team_table(df: pd.DataFrame, side: str) -> Styler:
-    header_bg = "#eeeeee"
-    bg = COLOR_LEFT_BG if side == 'L' else COLOR_RIGHT_BG
-
-    styler = df.style.set_properties(**{"background-color": bg, "width": "auto"})
-    cols_to_center = [c for c in df.columns if c != "Hráč"]
-    if cols_to_center:
-        styler = styler.set_properties(subset=cols_to_center, **{"text-align": "center"})
-
-    styler = styler.set_table_styles([
-        {"selector": "th", "props": f"font-weight:700; text-align:center; background-color:{header_bg};"}
-    ])
+# Stĺpce tímovej tabuľky pre st.dataframe (renderuje sa na klientovi, bez Styler → HTML)
+TEAM_TABLE_COLUMN_CONFIG = {
+    "Hráč": st.column_config.TextColumn("Hráč"),
+    "Body": st.column_config.TextColumn("Body"),
+    "Zápasy": st.column_config.NumberColumn("Zápasy", format="%d"),
+    "Úspešnosť": st.column_config.TextColumn("Úspešnosť"),
+}
 
-    try:
-        styler = styler.hide(axis="index")
-    except Exception:
-        styler = styler.hide_index()
 
-    return styler
+def show_team_table(df: pd.DataFrame, side: str) -> None:
+    """Tímová tabuľka cez st.dataframe – farba tímu je jediné pravidlo pre celú tabuľku."""
+    bg = COLOR_LEFT_BG if side == 'L' else COLOR_RIGHT_BG
+    st.dataframe(
+        df.style.set_properties(**{"background-color": bg}),
+        hide_index=True,
+        use_container_width=True,
+        column_config=TEAM_TABLE_COLUMN_CONFIG,
+    )
 
 def style_matches_table(df: pd.DataFrame) -> Styler:
     """Styler pre tabuľku zápasov: podfarbenie podľa víťaza, centrovanie, skrytý index.
@@ -684,22 +827,23 @@ def style_matches_table(df: pd.DataFrame) -> Styler:
         day_clean = df[day_col].astype(str).str.strip().str.replace(r"\.$", "", regex=True)
         day_series = pd.to_numeric(day_clean, errors="coerce").astype("Int64")
         df = df.copy()
-        df[day_col] = day_series
-
-    def _row_bg(row: pd.Series):
-        w = str(row.get("Víťaz", row.get("V", ""))).strip().lower()
-        if w in ("lefties", "l"):
-            bg = COLOR_LEFT_BG
-        elif w in ("righties", "r"):
-            bg = COLOR_RIGHT_BG
-        else:
-            bg = "inherit"
-        return [f"background-color: {bg}"] * len(row)
+        # hotový text už tu (vektorovo) – Styler potom nevolá formatter pre každú bunku
+        df[day_col] = day_series.astype("string").fillna("")
+
+    # Farba riadku podľa víťaza: jeden stĺpec štýlov (vektorovo), rozkopírovaný na všetky stĺpce naraz
+    # (apply axis=None) – namiesto Python callbacku pre každý riadok
+    win_col = "Víťaz" if "Víťaz" in df.columns else ("V" if "V" in df.columns else None)
+    w = df[win_col].astype(str).str.strip().str.lower() if win_col else pd.Series("", index=df.index)
+    row_bg = "background-color: " + pd.Series(
+        np.select([w.isin(("lefties", "l")), w.isin(("righties", "r"))], [COLOR_LEFT_BG, COLOR_RIGHT_BG], default="inherit"),
+        index=df.index,
+    )
 
-    styler = df.style.apply(_row_bg, axis=1)
+    def _bg_frame(data: pd.DataFrame) -> pd.DataFrame:
+        return pd.DataFrame(np.repeat(row_bg.to_numpy()[:, None], data.shape[1], axis=1),
+                            index=data.index, columns=data.columns)
 
-    if day_col:
-        styler = styler.format(subset=[day_col], formatter=lambda v: "" if pd.isna(v) else f"{int(v)}")
+    styler = df.style.apply(_bg_frame, axis=None)
 
     cols_to_center = [
         c for c in df.columns
@@ -719,6 +863,60 @@ def style_matches_table(df: pd.DataFrame) -> Styler:
 
     return styler
     
+@st.cache_data(show_spinner=False)
+def _matches_table_html(df: pd.DataFrame) -> str:
+    """HTML tabuľky zápasov v cache podľa obsahu DF (rok + zariadenie)."""
+    return style_matches_table(df).to_html()
+
+
+def style_stats_table(df: pd.DataFrame, highlight_col=None) -> Styler:
+    header_bg = "#eeeeee"
+    # krátke pevné uuid + bez id pri neštýlovaných bunkách -> menšie HTML pre st.markdown
+    styler = df.style
+    styler.set_uuid("stats")
+    styler.cell_ids = False
+
+    # Farba riadku podľa tímu a zvýraznený stĺpec ako CSS triedy buniek (pár pravidiel)
+    # namiesto apply(_row_bg, axis=1) + set_properties s inline štýlom pre každú bunku
+    team_col = next((c for c in (('', 'Team'), ('', 'T')) if c in df.columns), None)
+    team = df[team_col].astype(str).str.strip() if team_col else pd.Series("", index=df.index)
+    row_cls = np.select(
+        [team.isin(('Lefties', 'L')).to_numpy(), team.isin(('Righties', 'R')).to_numpy()],
+        ['team-left', 'team-right'],
+        default='',
+    )
+    cls = np.repeat(row_cls.astype(object)[:, None], df.shape[1], axis=1)
+    if highlight_col and highlight_col in df.columns:
+        j = df.columns.get_loc(highlight_col)
+        cls[:, j] = [f"{c} sort-col".strip() for c in cls[:, j]]
+    styler = styler.set_td_classes(pd.DataFrame(cls, index=df.index, columns=df.columns))
+
+    # zarovnanie: všetko na stred, len stĺpec Hráč vľavo (trieda colN od Styleru)
+    player_pos = df.columns.get_loc(('', 'Hráč')) if ('', 'Hráč') in df.columns else None
+    table_styles = [
+        # jedno pravidlo "th" pokrýva aj th.col_heading.level0/level1
+        {"selector": "th", "props": f"font-weight:700; text-align:center; background-color:{header_bg};"},
+        {"selector": "td", "props": "text-align:center;"},
+        {"selector": "td.team-left", "props": f"background-color:{COLOR_LEFT_BG};"},
+        {"selector": "td.team-right", "props": f"background-color:{COLOR_RIGHT_BG};"},
+        {"selector": "td.sort-col", "props": "font-weight:700; font-size:1.05rem;"},
+    ]
+    if player_pos is not None:
+        table_styles.append({"selector": f"td.col{player_pos}", "props": "text-align:left;"})
+    styler = styler.set_table_styles(table_styles)
+    try:
+        styler = styler.hide(axis='index')
+    except Exception:
+        styler = styler.hide_index()
+    return styler
+
+
+@st.cache_data(show_spinner=False)
+def _stats_table_html(df: pd.DataFrame, highlight_col=None) -> str:
+    """HTML tabuľky Štatistiky v cache podľa obsahu DF a zvýrazneného stĺpca."""
+    return style_stats_table(df, highlight_col=highlight_col).to_html()
+
+
 def style_simple_table(df: pd.DataFrame, bold_last: bool = False) -> pd.io.formats.style.Styler:
     """
     Jednoduchý styler pre sumarizačné tabuľky (Formát/Rezort/Dvojice).
@@ -747,12 +945,18 @@ def style_simple_table(df: pd.DataFrame, bold_last: bool = False) -> pd.io.forma
     if center_cols:
         sty = sty.set_properties(subset=center_cols, **{"text-align": "center"})
 
-    # Sivé podfarbenie riadku 'Spolu'
-    def _sum_row_bg(row: pd.Series):
-        is_sum = any(str(row.get(col, "")).strip() == "Spolu" for col in row.index)
-        return [f"background-color:{header_bg}; font-weight:700;" if is_sum else "" for _ in row]
+    # Sivé podfarbenie riadku 'Spolu': maska riadkov po stĺpcoch (vektorovo), rozkopírovaná naraz (axis=None)
+    # 'Spolu' môže byť len v textovom stĺpci – číselné stĺpce sa na text vôbec neprevádzajú
+    is_sum = np.zeros(len(df), dtype=bool)
+    for col in df.select_dtypes(exclude="number").columns:
+        is_sum |= (df[col].astype(str).str.strip() == "Spolu").to_numpy()
+    row_css = np.where(is_sum, f"background-color:{header_bg}; font-weight:700;", "")
+
+    def _sum_row_bg(data: pd.DataFrame) -> pd.DataFrame:
+        return pd.DataFrame(np.repeat(row_css[:, None], data.shape[1], axis=1),
+                            index=data.index, columns=data.columns)
 
-    sty = sty.apply(_sum_row_bg, axis=1)
+    sty = sty.apply(_sum_row_bg, axis=None)
 
     # Skryť index
     try:
@@ -767,6 +971,76 @@ def style_simple_table(df: pd.DataFrame, bold_last: bool = False) -> pd.io.forma
 
     return sty
 
+@st.cache_data(show_spinner=False)
+def _simple_table_html(df: pd.DataFrame, bold_last: bool = False) -> str:
+    """HTML sumarizačnej tabuľky v cache podľa obsahu DF (Styler sa nestavia pri každom rerune)."""
+    return style_simple_table(df, bold_last=bold_last).to_html()
+
+
+def _section_html(title: str, table_html: str, mobile_fit: bool = False) -> str:
+    """Nadpis + (voliteľne .mobile-fit wrapper) + HTML tabuľky ako jeden markdown – jeden element namiesto
+    troch až štyroch; wrapper tak tabuľku naozaj obalí (samostatné st.markdown s '<div>' ju neobalia)."""
+    if mobile_fit:
+        table_html = f'<div class="mobile-fit">{table_html}</div>'
+    return f"### {title}\n\n{table_html}"
+
+
+def _excel_col_widths(df: pd.DataFrame, pad: int = 2, cap: int = 60) -> list[int]:
+    """Šírky stĺpcov pre Excel: max(dĺžka hlavičky, najdlhší text v stĺpci) + padding, s limitom.
+    Dĺžky reťazcov počíta np.char.str_len naraz pre celý stĺpec."""
+    widths = []
+    for col_name in df.columns:
+        arr = df[col_name].astype(str).to_numpy(dtype=str)
+        longest = int(np.char.str_len(arr).max(initial=0))
+        widths.append(min(max(len(str(col_name)), longest) + pad, cap))
+    return widths
+
+
+_XLSX_CENTER = Alignment(horizontal="center", vertical="center", wrap_text=False)
+_XLSX_HEADER_FONT = Font(bold=True)
+_XLSX_HEADER_BORDER = Border(left=Side(style="thin"), right=Side(style="thin"),
+                             top=Side(style="thin"), bottom=Side(style="thin"))
+
+
+def write_only_sheet(wb: Workbook, df: pd.DataFrame, sheet_name: str, widths: list[int] | None = None) -> None:
+    """Zápis DF do hárka write-only workbooku: riadky sa streamujú (bez mriežky Cell objektov v pamäti),
+    hlavička tučná a orámovaná, všetko centrované; šírky stĺpcov podľa obsahu."""
+    ws = wb.create_sheet(title=sheet_name)
+
+    # šírky stĺpcov musia byť nastavené ešte pred zápisom riadkov
+    for col_idx, width in enumerate(_excel_col_widths(df) if widths is None else widths, start=1):
+        ws.column_dimensions[get_column_letter(col_idx)].width = width
+
+    def _cell(value, header: bool = False) -> WriteOnlyCell:
+        cell = WriteOnlyCell(ws, value=value)
+        cell.alignment = _XLSX_CENTER
+        if header:
+            cell.font = _XLSX_HEADER_FONT
+            cell.border = _XLSX_HEADER_BORDER
+        return cell
+
+    ws.append([_cell(str(c), header=True) for c in df.columns])
+    # NaN/NA -> None jedným vektorovým prechodom (namiesto pd.isna po bunkách)
+    df_cells = df.astype(object).where(df.notna(), None)
+    for row in df_cells.itertuples(index=False, name=None):
+        ws.append([_cell(v) for v in row])
+
+
+# Chyby zápisu XLSX, ktoré export hlási ako varovanie: I/O, neplatné hodnoty/názvy hárkov
+# a riadiace znaky v texte (IllegalCharacterError dedí len z Exception)
+XLSX_EXPORT_ERRORS = (OSError, ValueError, IllegalCharacterError)
+
+
+def workbook_bytes(sheets: list[tuple[str, pd.DataFrame]], widths: list[list[int]] | None = None) -> bytes:
+    """Hárky (názov, DF) -> obsah XLSX súboru cez write-only workbook; chyby zápisu nechá prebublať."""
+    wb = Workbook(write_only=True)
+    for i, (sheet_name, df) in enumerate(sheets):
+        write_only_sheet(wb, df, sheet_name, None if widths is None else widths[i])
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
 def get_portrait_ref(players_df: pd.DataFrame, canonical_name: str) -> str | None:
     """Vráti referenciu na portrét hráča z df_players_sheet.
 
@@ -839,6 +1113,41 @@ def _local_exists(path_str: str) -> bool:
     except Exception:
         return False
 
+@st.cache_data(ttl=86400, show_spinner=False)
+def _fetch_image_bytes(url: str) -> bytes | None:
+    """Stiahne obrázok z http(s) URL raz a drží pôvodné bajty v cache.
+    Pri lokálnej ceste vráti None; chyba siete/HTTP prebublá (výnimka sa do cache neuloží,
+    ďalší rerun skúsi stiahnutie znova) – zachytáva ju volajúci."""
+    if not url or not isinstance(url, str):
+        return None
+    u = url.strip()
+    if not (u.startswith('http://') or u.startswith('https://')):
+        return None
+    import requests
+    r = requests.get(u, timeout=5)
+    r.raise_for_status()
+    return r.content
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _fetch_photo(url: str, max_width: int = 800) -> bytes | None:
+    """
+    Stiahne vzdialenú fotku (napr. fotka turnaja) a zmenší ju na max. šírku `max_width` px.
+    Výsledok (JPEG bajty) je v cache podľa URL – pri ďalších rerunoch sa už nesťahuje ani nedekóduje.
+    Pri lokálnej ceste vráti None; chyba sťahovania/dekódovania prebublá (do cache sa neuloží)
+    a volajúci potom použije priamo URL.
+    """
+    if not url or not isinstance(url, str):
+        return None
+    raw = _fetch_image_bytes(url)
+    if raw is None:
+        return None
+    from PIL import Image
+    img = Image.open(io.BytesIO(raw))
+    img.thumbnail((max_width, 99999))
+    out = io.BytesIO()
+    img.convert("RGB").save(out, format="JPEG", quality=85)
+    return out.getvalue()
+
 def resolve_portrait_ref(ref) -> str | None:
     # Lokálne portréty: Excel obsahuje iba názov súboru (napr. 'SegéňJ.jpg').
     if ref is None or (isinstance(ref, float) and pd.isna(ref)):
@@ -908,6 +1217,12 @@ def _current_user_id():
                         return str(info.get(k))
     except Exception:
         pass
+    return _os_login()
+
+
+@lru_cache(maxsize=1)
+def _os_login() -> str:
+    """OS login (fallback pre _current_user_id) – raz za proces; Streamlit používateľa necachujeme (líši sa podľa session)."""
     try:
         import getpass
         return getpass.getuser() or "default"
@@ -922,7 +1237,6 @@ FILTER_JSON_FILE = f"Filter/filter_state_{_uid_s}.json"
 class FilterState:
     t_all: bool = True
     t_selected: list[str] = field(default_factory=list)            # "Rok - Rezort"
-    t_child_map: dict[str, bool] = field(default_factory=dict)     # key -> bool
     teams: list[str] = field(default_factory=lambda: ['Lefties', 'Righties'])
     formats: list[str] = field(default_factory=lambda: ['Foursome', 'Fourball', 'Single'])
 
@@ -930,28 +1244,31 @@ class FilterState:
 FILTER = FilterState()
 
 
-def _build_tournament_items(df_tournaments: pd.DataFrame) -> list[dict]:
-    tdf = df_tournaments.copy()
+@st.cache_data(show_spinner=False)
+def _build_tournament_items(df_tournaments: pd.DataFrame) -> list[str]:
+    """Popisy turnajov 'rok - rezort' (rok ↓) pre multiselect 'flt_tournaments'."""
+    # bez kópie celého DF: iba dva potrebné stĺpce, zoradené podľa roku
+    tdf = df_tournaments
+    rezort_s = tdf["Rezort"].astype(str).str.strip() if "Rezort" in tdf.columns else pd.Series("", index=tdf.index)
     if "Rok" in tdf.columns:
-        tdf["Rok"] = pd.to_numeric(tdf["Rok"], errors="coerce").astype("Int64")
-        tdf = tdf.sort_values("Rok", ascending=False)
-    if "Rezort" not in tdf.columns:
-        tdf["Rezort"] = ""
-    items = []
-    for i, r in tdf.iterrows():
-        year = r.get("Rok")
-        rezort = str(r.get("Rezort", "")).strip()
-        key = f"flt_t_{int(year) if pd.notna(year) else i}"
-        label = f"{int(year) if pd.notna(year) else ''} - {rezort}".strip(" -")
-        items.append({"key": key, "label": label})
-    return items
+        year_s = tdf["Rok"].sort_values(ascending=False)  # Int64 z prepare_tournaments
+        order = year_s.index
+        years = year_s.tolist()
+    else:
+        order = tdf.index
+        years = [None] * len(tdf)
+    rezorts = rezort_s.loc[order].tolist()
+    # zip stĺpcov namiesto iterrows (bez Series na každý riadok)
+    labels = []
+    for year, rezort in zip(years, rezorts):
+        year_txt = str(int(year)) if pd.notna(year) else ""
+        labels.append(f"{year_txt} - {rezort}".strip(" -"))
+    return labels
 
 
 def update_filter_from_session() -> None:
-    FILTER.t_all = st.session_state.get('flt_t_all', True)
-    keys = st.session_state.get('flt_t_keys', [])
-    FILTER.t_child_map = {k: st.session_state.get(k, False) for k in keys}
     FILTER.t_selected = st.session_state.get('flt_tournaments', [])
+    FILTER.t_all = len(FILTER.t_selected) == len(_build_tournament_items(df_tournaments))
     FILTER.teams = st.session_state.get('flt_teams', [])
     FILTER.formats = st.session_state.get('flt_formats', [])
 
@@ -959,7 +1276,7 @@ def update_filter_from_session() -> None:
 def _save_filter_to_json() -> None:
     data = {
         "version": 1,
-        "t_all": st.session_state.get('flt_t_all', True),
+        "t_all": FILTER.t_all,
         "t_selected_labels": st.session_state.get('flt_tournaments', []),
         "teams": st.session_state.get('flt_teams', []),
         "formats": st.session_state.get('flt_formats', []),
@@ -967,11 +1284,34 @@ def _save_filter_to_json() -> None:
         "player_selected_display": st.session_state.get('player_detail_selected_display', None),
         "stats_hide_one_tournament": st.session_state.get('stats_hide_one_tournament', False),
     }
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    # debounce: rovnaký obsah ako pri poslednom zápise -> disk netreba
+    payload_hash = hash(payload)
+    if st.session_state.get('_flt_last_hash') == payload_hash:
+        return
+    tmp_name = None
     try:
-        Path(FILTER_JSON_FILE).parent.mkdir(parents=True, exist_ok=True)
-        Path(FILTER_JSON_FILE).write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+        target = Path(FILTER_JSON_FILE)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # atomický zápis: unikátny temp súbor v tom istom adresári + os.replace (čitateľ nikdy nevidí
+        # polovičný JSON; súbežné session toho istého používateľa – vlákna jedného procesu – si ho neprepíšu)
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=target.parent,
+                                         prefix=target.name + ".", suffix=".tmp", delete=False) as tmp:
+            tmp_name = tmp.name
+            tmp.write(payload)
+        os.replace(tmp_name, target)
+        tmp_name = None
+        st.session_state['_flt_last_hash'] = payload_hash
+        # vlastný zápis nemá v bootstrap_filter_state vyvolať reload (zmenil sa mtime)
+        st.session_state['flt_json_mtime'] = target.stat().st_mtime
     except Exception:
         pass
+    finally:
+        if tmp_name is not None:  # zápis zlyhal pred os.replace -> temp súbor nenechávaj
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
 
 def _load_filter_from_json() -> dict | None:
     p = Path(FILTER_JSON_FILE)
@@ -999,16 +1339,12 @@ def bootstrap_filter_state() -> None:
         update_filter_from_session()
         return
 
-    # 1) Vytvor položky turnajov a ulož ich kľúče (na to sa viažu checkboxy).
-    items = _build_tournament_items(df_tournaments)
-    st.session_state['flt_t_keys'] = [it['key'] for it in items]
+    # 1) Položky turnajov (labely pre multiselect 'flt_tournaments').
+    labels = _build_tournament_items(df_tournaments)
     st.session_state.setdefault('flt_json_mtime', None)
 
     # 2) Defaultné nastavenia (prvý štart bez JSON)
-    for it in items:
-        st.session_state.setdefault(it['key'], True)
-    st.session_state.setdefault('flt_t_all', True)
-    st.session_state['flt_tournaments'] = [it['label'] for it in items]
+    st.session_state['flt_tournaments'] = labels
 
     st.session_state.setdefault('flt_team_lefties', True)
     st.session_state.setdefault('flt_team_righties', True)
@@ -1026,31 +1362,29 @@ def bootstrap_filter_state() -> None:
     # 3) Načítaj JSON (ak existuje) a aplikuj hodnoty
     saved = _load_filter_from_json()
     if saved:
-        # načítaj master stav z JSON (ak chýba, dopočítaj neskôr)
-        st.session_state['flt_t_all'] = bool(saved.get('t_all', False))
-        labels_sel = list(saved.get('t_selected_labels', []))
-        years_sel = set()
-        for lbl in labels_sel:
-            try:
-                years_sel.add(int(str(lbl).split(' - ')[0].strip()))
-            except Exception:
-                pass
-        for it in items:
-            if it['label'] in labels_sel:
-                st.session_state[it['key']] = True
-            else:
+        # hash načítaného obsahu – ak sa stav nezmení, záverečný _save_filter_to_json nič nezapíše
+        st.session_state['_flt_last_hash'] = hash(json.dumps(saved, ensure_ascii=False, separators=(",", ":")))
+        # t_all z JSON = všetky turnaje (aj tie pridané neskôr); inak podľa labelov, záložne podľa roku
+        if saved.get('t_all', False):
+            st.session_state['flt_tournaments'] = labels
+        else:
+            labels_sel = set(saved.get('t_selected_labels', []))
+            years_sel = set()
+            for lbl in labels_sel:
+                try:
+                    years_sel.add(int(str(lbl).split(' - ')[0].strip()))
+                except Exception:
+                    pass
+
+            def _is_selected(lbl: str) -> bool:
+                if lbl in labels_sel:
+                    return True
                 try:
-                    y_it = int(str(it['label']).split(' - ')[0].strip())
-                    st.session_state[it['key']] = (y_it in years_sel) if years_sel else False
+                    return int(str(lbl).split(' - ')[0].strip()) in years_sel
                 except Exception:
-                    st.session_state[it['key']] = False
+                    return False
 
-        # ak je master v JSON True, označ všetky deti; inak dopočítaj z detí
-        if st.session_state.get('flt_t_all', False):
-            for k in st.session_state.get('flt_t_keys', []):
-                st.session_state[k] = True
-        st.session_state['flt_t_all'] = all(st.session_state.get(k, False) for k in st.session_state.get('flt_t_keys', []))
-        st.session_state['flt_tournaments'] = [it['label'] for it in items if st.session_state[it['key']]]
+            st.session_state['flt_tournaments'] = [lbl for lbl in labels if _is_selected(lbl)]
 
         teams = saved.get('teams', ['Lefties', 'Righties'])
         st.session_state['flt_team_lefties']  = ('Lefties'  in teams)
@@ -1075,12 +1409,7 @@ def bootstrap_filter_state() -> None:
 
 
 def _on_filter_change() -> None:
-    items = _build_tournament_items(df_tournaments)
-
-    selected = [it['label'] for it in items if st.session_state.get(it['key'], False)]
-    st.session_state['flt_tournaments'] = selected
-    st.session_state['flt_t_all'] = all(st.session_state.get(k, False) for k in st.session_state.get('flt_t_keys', []))
-
+    # turnaje číta update_filter_from_session priamo z multiselectu 'flt_tournaments'
     teams = []
     if st.session_state.get('flt_team_lefties'):
         teams.append('Lefties')
@@ -1101,10 +1430,8 @@ def _on_filter_change() -> None:
     _save_filter_to_json()
 
 
-def _toggle_all_tournaments() -> None:
-    val = st.session_state.get('flt_t_all', True)
-    for k in st.session_state.get('flt_t_keys', []):
-        st.session_state[k] = val
+def _on_filter_submit() -> None:
+    """Potvrdenie formulára Filter – zmeny sa aplikujú naraz (1 rerun)."""
     _on_filter_change()
 
 def _on_player_select_change() -> None:
@@ -1119,216 +1446,307 @@ bootstrap_filter_state()
 # NOVÉ jadro Štatistík podľa pravidiel 1–6
 # -----------------------------
 
+@st.cache_data(show_spinner=False)
 def build_player_team_map(df_all: pd.DataFrame) -> dict[str, str]:
     """Zaradenie hráčov do tímov podľa výskytu v L1/L2 (Lefties) a R1/R2 (Righties).
        Pri výskyte v oboch: použijeme vyšší počet; pri rovnosti preferuj Lefties."""
-    cntL, cntR = {}, {}
-    for col in ("L1", "L2"):
-        if col in df_all.columns:
-            for nm in df_all[col].dropna().astype(str).str.strip():
-                if nm:
-                    cntL[nm] = cntL.get(nm, 0) + 1
-    for col in ("R1", "R2"):
-        if col in df_all.columns:
-            for nm in df_all[col].dropna().astype(str).str.strip():
-                if nm:
-                    cntR[nm] = cntR.get(nm, 0) + 1
-
-    players = set(cntL) | set(cntR)
-    team = {}
-    for p in players:
-        l, r = cntL.get(p, 0), cntR.get(p, 0)
-        if l > r:
-            team[p] = "Lefties"
-        elif r > l:
-            team[p] = "Righties"
-        else:
-            team[p] = "Lefties" if l > 0 else ("Righties" if r > 0 else "Lefties")
-    return team
+    def _counts(cols: tuple[str, ...]) -> pd.Series:
+        parts = [df_all[c] for c in cols if c in df_all.columns]
+        if not parts:
+            return pd.Series(dtype="int64")
+        return pd.concat(parts).dropna().value_counts()
+
+    cntL, cntR = _counts(("L1", "L2")), _counts(("R1", "R2"))
+    players = cntL.index.union(cntR.index)
+    l = cntL.reindex(players, fill_value=0).to_numpy()
+    r = cntR.reindex(players, fill_value=0).to_numpy()
+    # každý hráč v `players` má aspoň 1 výskyt -> rovnosť znamená l == r > 0 -> Lefties
+    team_arr = np.where(l >= r, "Lefties", "Righties")
+    return dict(zip(players, team_arr.tolist()))
 
 
+@st.cache_data(show_spinner=False)
+def player_codes(df_all: pd.DataFrame) -> tuple[pd.Index, pd.DataFrame]:
+    """Mená v L1..R2 ako int32 kódy do spoločného zoznamu hráčov (-1 = prázdny slot).
+    Porovnania a groupby v detaile hráča tak idú nad celými číslami namiesto reťazcov."""
+    present = [c for c in ("L1", "L2", "R1", "R2") if c in df_all.columns]
+    names = pd.Index(pd.unique(pd.concat([df_all[c] for c in present]).dropna()) if present else [])
+    codes = pd.DataFrame({
+        c: (names.get_indexer(df_all[c]) if c in present else np.full(len(df_all), -1)).astype(np.int32)
+        for c in ("L1", "L2", "R1", "R2")
+    }, index=df_all.index)
+    return names, codes
+
+
+@st.cache_data(show_spinner=False)
+def build_rezort_map(df_tournaments: pd.DataFrame) -> dict[int, str]:
+    """Rok -> Rezort z hárku turnajov (orezané), v cache – mení sa len s načítanými dátami."""
+    if df_tournaments.empty or "Rok" not in df_tournaments.columns or "Rezort" not in df_tournaments.columns:
+        return {}
+    t_rez = df_tournaments.dropna(subset=["Rok"])
+    return dict(zip(t_rez["Rok"].astype(int).tolist(), t_rez["Rezort"].astype(str).str.strip().tolist()))
+
+
+@st.cache_data(show_spinner=False)
+def filter_matches(df_all: pd.DataFrame, sel_years: tuple[int, ...], sel_formats: tuple[str, ...]) -> pd.DataFrame:
+    """Zápasy podľa vybraných rokov (prázdne = všetky) a formátov – v cache podľa filtra, nie pri každom rerune."""
+    mask = np.ones(len(df_all), dtype=bool)
+    if sel_years:
+        mask &= df_all["Rok"].isin(sel_years).to_numpy(dtype=bool)
+    mask &= df_all["Formát"].isin(sel_formats).to_numpy(dtype=bool)
+    return df_all[mask]
+
+
+@st.cache_data(show_spinner=False)
 def compute_stats_for_filtered(
     df_matches: pd.DataFrame,
-    sel_years: list[int],
-    sel_formats: set[str],
-    sel_teams: set[str],
-    team_map: dict[str, str],
+    sel_years: tuple[int, ...],
+    sel_formats: tuple[str, ...],
+    sel_teams: tuple[str, ...],
 ):
     """Prejde vyfiltrované zápasy a spočíta body + zápasy pre hráčov podľa strán.
-       LEFT hráči berú Lbody; RIGHT hráči berú Rbody. Formát = stĺpec "Formát"."""
-    from collections import defaultdict
-
+       LEFT hráči berú Lbody; RIGHT hráči berú Rbody. Formát = stĺpec "Formát".
+       Vracia (df_disp, df_num): zobrazovanú tabuľku s textovými hodnotami a číselnú pre zoradenie.
+       Výsledok je v cache – výbery posielaj ako zoradené tuple (stabilný kľúč cache).
+       Mapa hráč -> tím sa berie z build_player_team_map (cache) – nie je argumentom, aby sa dict
+       nehashoval pri každom rerune."""
     # Guard: ak nie je vybraný žiaden formát, nepočítaj nič
     if sel_formats is not None and len(sel_formats) == 0:
-        return [], []
+        return pd.DataFrame(), pd.DataFrame()
     # Guard: ak nie je vybraný žiaden turnaj/rok (prázdny výber), nepočítaj nič
     # Pozn.: prázdny zoznam rokov znamená 'nič vybraté' (nie 'všetko')
     if sel_years is not None and len(sel_years) == 0:
-        return [], []
-
-    df_y = df_matches.copy()
-    if sel_years:
-        df_y = df_y[df_y["Rok"].isin(sel_years)]
-    if sel_formats:
-        df_y = df_y[df_y["Formát"].isin(sel_formats)]
+        return pd.DataFrame(), pd.DataFrame()
 
     FMT_KEYS = ("Foursome", "Fourball", "Single")
+    if "Formát" not in df_matches.columns:
+        return pd.DataFrame(), pd.DataFrame()
 
-    def _empty_bucket():
-        return {
-            "Team": "",
-            "Foursome": {"pts": 0.0, "cnt": 0},
-            "Fourball": {"pts": 0.0, "cnt": 0},
-            "Single": {"pts": 0.0, "cnt": 0},
-        }
-
-    stats = defaultdict(_empty_bucket)
-
-    for _, row in df_y.iterrows():
-        fmt = str(row.get("Formát", "")).strip()
-        if fmt not in FMT_KEYS:
+    # jedna kombinovaná maska a jedno indexovanie (bez predchádzajúcej kópie celého DF);
+    # obmedzenie na známe formáty (FMT_KEYS) je súčasťou masky, nie filtra nad dlhým formátom
+    fmt_filter = frozenset(FMT_KEYS).intersection(sel_formats) if sel_formats else frozenset(FMT_KEYS)
+    masks = [df_matches["Formát"].isin(fmt_filter).to_numpy(dtype=bool)]
+    if sel_years:
+        masks.append(df_matches["Rok"].isin(sel_years).to_numpy(dtype=bool))
+    # len stĺpce, ktoré výpočet potrebuje (užší výrez = menej kopírovaných dát)
+    used_cols = [c for c in ("Formát", "L1", "L2", "R1", "R2", "Lbody", "Rbody") if c in df_matches.columns]
+    df_y = df_matches.loc[np.logical_and.reduce(masks), used_cols]
+
+    # Dlhý formát: 1 riadok = (hráč, formát, body) pre každý obsadený slot L1/L2/R1/R2.
+    # LEFT sloty berú Lbody, RIGHT sloty Rbody; agregácia potom cez groupby (bez Python cyklu po zápasoch).
+    # Lbody/Rbody/Formát/mená sú typovo pripravené v prepare_matches – tu už žiadne konverzie
+    def _body_col(col: str) -> np.ndarray:
+        if col not in df_y.columns:
+            return np.zeros(len(df_y))
+        return df_y[col].to_numpy(dtype=float)
+
+    fmt_arr = df_y["Formát"].astype(object).to_numpy()
+    body_by_side = {"L": _body_col("Lbody"), "R": _body_col("Rbody")}
+    pos = np.arange(len(df_y))
+
+    parts = []
+    for slot, (col, side, default_team) in enumerate((
+        ("L1", "L", "Lefties"), ("L2", "L", "Lefties"),
+        ("R1", "R", "Righties"), ("R2", "R", "Righties"),
+    )):
+        if col not in df_y.columns:
             continue
-
-        # hráči na ľavej a pravej strane
-        left_names, right_names = [], []
-        for col in ("L1", "L2"):
-            if col in df_y.columns:
-                nm = _clean_name(row.get(col))
-                if nm:
-                    left_names.append(nm)
-        for col in ("R1", "R2"):
-            if col in df_y.columns:
-                nm = _clean_name(row.get(col))
-                if nm:
-                    right_names.append(nm)
-
-        # body riadku
-        lbody = row.get("Lbody", 0)
-        rbody = row.get("Rbody", 0)
-        try:
-            lbody = float(lbody) if lbody is not None else 0.0
-        except Exception:
-            lbody = 0.0
-        try:
-            rbody = float(rbody) if rbody is not None else 0.0
-        except Exception:
-            rbody = 0.0
-
-        # ľavá strana -> Lbody
-        for p in left_names:
-            p_team = team_map.get(p, "Lefties")
-            if sel_teams and (p_team not in sel_teams):
-                continue
-            b = stats[p]
-            b["Team"] = p_team
-            b[fmt]["pts"] += lbody
-            b[fmt]["cnt"] += 1
-
-        # pravá strana -> Rbody
-        for p in right_names:
-            p_team = team_map.get(p, "Righties")
-            if sel_teams and (p_team not in sel_teams):
-                continue
-            b = stats[p]
-            b["Team"] = p_team
-            b[fmt]["pts"] += rbody
-            b[fmt]["cnt"] += 1
-
-    def _fmt_points(x: float) -> str:
-        return f"{int(x)}" if float(x).is_integer() else f"{x:.1f}"
-
-    def _pct(points_sum: float, cnt: int) -> int:
-        return int(round((points_sum / cnt) * 100)) if cnt else 0
-
-    rows_disp, rows_num = [], []
-    for p, b in stats.items():
-        team = b["Team"] or team_map.get(p, "Lefties")
-        fs_pts, fs_cnt = b["Foursome"]["pts"], b["Foursome"]["cnt"]
-        fb_pts, fb_cnt = b["Fourball"]["pts"], b["Fourball"]["cnt"]
-        si_pts, si_cnt = b["Single"]["pts"], b["Single"]["cnt"]
-        total_pts = fs_pts + fb_pts + si_pts
-        total_cnt = fs_cnt + fb_cnt + si_cnt
-
-        rows_disp.append({
-            'Hráč': to_firstname_first(p),
-            'Team': team,
-            'Foursome Body': _fmt_points(fs_pts),
-            'Foursome Zápasy': fs_cnt,
-            'Foursome Úsp.': f"{_pct(fs_pts, fs_cnt)} %",
-            'Fourball Body': _fmt_points(fb_pts),
-            'Fourball Zápasy': fb_cnt,
-            'Fourball Úsp.': f"{_pct(fb_pts, fb_cnt)} %",
-            'Single Body': _fmt_points(si_pts),
-            'Single Zápasy': si_cnt,
-            'Single Úsp.': f"{_pct(si_pts, si_cnt)} %",
-            'Spolu Body': _fmt_points(total_pts),
-            'Spolu Zápasy': total_cnt,
-            'Spolu Úsp.': f"{_pct(total_pts, total_cnt)} %",
-        })
-
-        rows_num.append({
-            'Hráč': to_firstname_first(p),
-            'Team': team,
-            'Foursome Body': float(fs_pts),
-            'Foursome Zápasy': int(fs_cnt),
-            'Foursome Úsp.': _pct(fs_pts, fs_cnt),
-            'Fourball Body': float(fb_pts),
-            'Fourball Zápasy': int(fb_cnt),
-            'Fourball Úsp.': _pct(fb_pts, fb_cnt),
-            'Single Body': float(si_pts),
-            'Single Zápasy': int(si_cnt),
-            'Single Úsp.': _pct(si_pts, si_cnt),
-            'Spolu Body': float(total_pts),
-            'Spolu Zápasy': int(total_cnt),
-            'Spolu Úsp.': _pct(total_pts, total_cnt),
-        })
-
-    return rows_disp, rows_num
+        parts.append(pd.DataFrame({
+            "pos": pos,
+            "slot": slot,
+            "p": df_y[col].to_numpy(),
+            "fmt": fmt_arr,
+            "body": body_by_side[side],
+            "default_team": default_team,
+        }))
+    if not parts:
+        return pd.DataFrame(), pd.DataFrame()
+
+    long = pd.concat(parts, ignore_index=True)
+    long = long[long["p"].notna()]
+    long["team"] = long["p"].map(build_player_team_map(df_matches)).fillna(long["default_team"])
+    if sel_teams:
+        long = long[long["team"].isin(frozenset(sel_teams))]
+    if long.empty:
+        return pd.DataFrame(), pd.DataFrame()
+
+    # poradie hráčov = poradie prvého výskytu v zápasoch (ako pri pôvodnom prechode po riadkoch)
+    long = long.sort_values(["pos", "slot"], kind="stable")
+
+    # Hráči -> celočíselné kódy (factorize zachová poradie prvého výskytu), formát -> 0/1/2;
+    # body a počty sa nasčítajú priamo do matíc hráč x formát cez np.add.at (bez groupby/unstack)
+    codes, players = pd.factorize(long["p"], sort=False)
+    fmt_idx = pd.Index(FMT_KEYS).get_indexer(long["fmt"])
+    pts = np.zeros((len(players), len(FMT_KEYS)))
+    cnt = np.zeros((len(players), len(FMT_KEYS)), dtype=int)
+    np.add.at(pts, (codes, fmt_idx), long["body"].to_numpy(dtype=float))
+    np.add.at(cnt, (codes, fmt_idx), 1)
+    # tím hráča = tím pri jeho prvom výskyte
+    _, first_pos = np.unique(codes, return_index=True)
+    team_by_player = long["team"].to_numpy()[first_pos]
+
+    # Výsledné tabuľky stĺpcovo z matíc (hráč x formát) – bez Python cyklu a dictov po hráčoch
+    pts = np.column_stack([pts, pts.sum(axis=1)])  # posledný stĺpec = Spolu
+    cnt = np.column_stack([cnt, cnt.sum(axis=1)])
+    pct = np.round(pts / np.where(cnt > 0, cnt, 1) * 100).astype(int)
+    pct[cnt == 0] = 0
+
+    def _fmt_points(v: np.ndarray) -> np.ndarray:
+        whole = np.mod(v, 1) == 0
+        return np.where(whole, v.astype(np.int64).astype(str), np.char.mod("%.1f", v))
+
+    names = [to_firstname_first(p) for p in players]
+    teams = team_by_player.tolist()
+    cols_disp = {'Hráč': names, 'Team': teams}
+    cols_num = {'Hráč': names, 'Team': teams}
+    for k, sec in enumerate(FMT_KEYS + ("Spolu",)):
+        cols_disp[f'{sec} Body'] = _fmt_points(pts[:, k])
+        cols_disp[f'{sec} Zápasy'] = cnt[:, k]
+        cols_disp[f'{sec} Úsp.'] = np.char.add(pct[:, k].astype(str), " %")
+        cols_num[f'{sec} Body'] = pts[:, k]
+        cols_num[f'{sec} Zápasy'] = cnt[:, k]
+        cols_num[f'{sec} Úsp.'] = pct[:, k]
+
+    return pd.DataFrame(cols_disp), pd.DataFrame(cols_num)
 
 
+@st.cache_data(show_spinner=False)
 def build_player_years_count_display(df_all: pd.DataFrame) -> dict[str, int]:
     """
     Vráti mapu: 'Meno Priezvisko' (display) -> počet unikátnych ročníkov, v ktorých hráč hral
     (globálne naprieč všetkými dátami, nezávisle od filtra).
+    Dlhý formát (melt L1..R2) + groupby nunique namiesto iterrows.
     """
-    if df_all is None or df_all.empty:
+    if df_all is None or df_all.empty or "Rok" not in df_all.columns:
+        return {}
+    cols = [c for c in ("L1", "L2", "R1", "R2") if c in df_all.columns]
+    if not cols:
         return {}
 
-    tmp = df_all.copy()
-    if "Rok" not in tmp.columns:
+    # mená sú už orezané z prepare_matches (prázdne = NaN)
+    long = df_all.melt(id_vars="Rok", value_vars=cols, value_name="p").dropna(subset=["Rok", "p"])
+    if long.empty:
         return {}
 
-    # Rok ako číslo (Int64), aby sa dal bezpečne používať v množinách
-    tmp["Rok"] = pd.to_numeric(tmp["Rok"], errors="coerce").astype("Int64")
+    # v štatistikách sa používa to_firstname_first() (Meno Priezvisko), rovnaký tvar aj tu,
+    # aby sedelo filtrovanie na df_disp['Hráč']; prevod len pre unikátne mená
+    uniq = long["p"].unique()
+    disp = dict(zip(uniq, (to_firstname_first(p) for p in uniq)))
+    return long.groupby(long["p"].map(disp))["Rok"].nunique().to_dict()
+    
+  
+
+  
+    
+def _vec_firstname_first(s: pd.Series) -> pd.Series:
+    """Vektorová verzia to_firstname_first nad stĺpcom textov."""
+    parts = s.str.split().str.join(" ").str.rsplit(" ", n=1)
+    swapped = parts.str[-1] + " " + parts.str[0]
+    return swapped.where(parts.str.len() == 2, s)
 
-    years_by_player: dict[str, set[int]] = {}
 
-    for col in ("L1", "L2", "R1", "R2"):
-        if col not in tmp.columns:
+@st.cache_data(show_spinner=False)
+def _tournament_records(df_tournaments: pd.DataFrame) -> list[dict]:
+    """Turnaje zoradené podľa Rok ↓ ako list dictov – karta Turnaje iteruje dicty namiesto iterrows (Series na riadok).
+    Popis tlačidla (ikona víťaza + rok + rezort) je pripravený vektorovo v kľúči '__label'."""
+    tdf = df_tournaments
+    if "Rok" in tdf.columns:
+        # index = rok (stĺpec Rok ostáva), zoradené podľa indexu
+        tdf = tdf.set_index("Rok", drop=False).rename_axis(None).sort_index(ascending=False)
+    else:
+        tdf = tdf.copy()  # nižšie pridávame stĺpce – set_index už vracia nový DF
+
+    def _text(col: str) -> pd.Series:
+        return tdf[col].astype(str).str.strip() if col in tdf.columns else pd.Series("", index=tdf.index)
+
+    icon = _text("Víťaz").str.lower().map({"lefties": "🔵", "righties": "🔴"}).fillna("⚪")
+    if "Rok" in tdf.columns:
+        years = tdf["Rok"].astype(str).replace("<NA>", "None")
+    else:
+        years = pd.Series("None", index=tdf.index)
+    tdf["__label"] = icon + "    " + years + "     " + _text("Rezort")
+
+    # kapitáni 'Meno Priezvisko' vektorovo (rovnaké pravidlo ako to_firstname_first)
+    tdf["__Lcap"] = _vec_firstname_first(_text("L-Captain"))
+    tdf["__Rcap"] = _vec_firstname_first(_text("R-Captain"))
+
+    # konečný stav turnaja ako čísla naraz (alias 'StavL' / 'Stav L'); neplatné/prázdne = 0
+    def _num(*cols: str) -> pd.Series:
+        col = next((c for c in cols if c in tdf.columns), None)
+        if col is None:
+            return pd.Series(0.0, index=tdf.index)
+        return pd.to_numeric(tdf[col], errors="coerce").fillna(0.0)
+
+    tdf["__StavL"] = _num("StavL", "Stav L")
+    tdf["__StavR"] = _num("StavR", "Stav R")
+    return tdf.to_dict("records")
+
+
+@st.cache_resource(show_spinner=False)
+def _tournaments_by_year(df_tournaments: pd.DataFrame, df_matches: pd.DataFrame) -> dict[int, dict]:
+    """Záznamy z _tournament_records podľa roku (poradie Rok ↓) doplnené o súčty bodov '__Ltotal'/'__Rtotal'.
+    cache_resource: rerun dostane ten istý objekt bez kópie (cache_data by dict zakaždým kopíroval) – len na čítanie."""
+    totals = _year_totals(df_matches)
+    out = {}
+    for t in _tournament_records(df_tournaments):
+        if pd.isna(t.get("Rok")):
             continue
-        for _, r in tmp[["Rok", col]].dropna().iterrows():
-            y = r["Rok"]
-            nm = str(r[col]).strip()
-            if pd.isna(y) or not nm:
-                continue
+        year = int(t["Rok"])
+        has_year = year in totals.index
+        out[year] = {
+            **t,
+            "__Ltotal": float(totals.at[year, "Lbody"]) if has_year else 0.0,
+            "__Rtotal": float(totals.at[year, "Rbody"]) if has_year else 0.0,
+        }
+    return out
 
-            # v štatistikách používate to_firstname_first() (Meno Priezvisko),
-            # tak rovnaký tvar použijeme aj tu, aby sedelo filtrovanie na df_disp['Hráč']
-            disp = to_firstname_first(nm)
 
-            years_by_player.setdefault(disp, set()).add(int(y))
+@st.cache_data(show_spinner=False)
+def _year_positional_index(df_all: pd.DataFrame) -> dict[int, np.ndarray]:
+    """Pozície riadkov zápasov pre každý rok (invertovaný index z groupby.indices) –
+    zápasy roka sú df.take(pozície), bez masky nad celým DF; cache drží len malé polia."""
+    if "Rok" not in df_all.columns:
+        return {}
+    return {int(y): pos for y, pos in df_all.groupby("Rok", sort=False).indices.items()}
+
+
+# Stĺpce tabuľky zápasov v karte Turnaje (aj hárok 'Zápasy {rok}' v exporte)
+MATCHES_VIEW_COLS = ["Rok", "Deň", "Zápas", "Formát", "Lefties", "Righties", "Víťaz", "A/S"]
+
+
+@st.cache_data(show_spinner=False)
+def _year_totals(df_all: pd.DataFrame) -> pd.DataFrame:
+    """Súčet Lbody/Rbody za každý rok jedným groupby (index = rok ako int)."""
+    if "Rok" not in df_all.columns:
+        return pd.DataFrame(columns=["Lbody", "Rbody"])
+    body = df_all.reindex(columns=["Lbody", "Rbody"]).fillna(0.0)
+    totals = body.groupby(df_all["Rok"], sort=False).sum()
+    totals.index = totals.index.astype(int)
+    return totals
 
-    return {p: len(ys) for p, ys in years_by_player.items()}
-    
-  
 
-  
-    
 # =============================
 # UI – Tabs: Turnaje | Štatistiky | Detail hráča | Filter
 # =============================
 
-tab_turnaje, tab_stats, tab_player, tab_filter = st.tabs(["Turnaje", "Štatistiky", "Detail hráča", "Filter"])
+# Prepínač kariet namiesto st.tabs: st.tabs vykonáva telo všetkých kariet pri každom rerune,
+# tu sa vykoná iba aktívna karta.
+TABS = ["Turnaje", "Štatistiky", "Detail hráča", "Filter"]
+
+# Widgety neaktívnych kariet sa nevykreslia a Streamlit by ich stav zahodil – prepíšeme ho,
+# aby sa z neho stal bežný (trvalý) kľúč session_state.
+PERSISTENT_WIDGET_KEYS = (
+    'open_year',
+    'stats_hide_one_tournament', 'stats_sort_select',
+    'player_detail_selected_display',
+    'flt_tournaments', 'flt_team_lefties', 'flt_team_righties',
+    'flt_fmt_foursome', 'flt_fmt_fourball', 'flt_fmt_single',
+)
+for _k in PERSISTENT_WIDGET_KEYS:
+    if _k in st.session_state:
+        st.session_state[_k] = st.session_state[_k]
+
+active_tab = st.radio("Karta", TABS, key="active_tab", horizontal=True, label_visibility="collapsed")
 
 
 
@@ -1336,7 +1754,7 @@ tab_turnaje, tab_stats, tab_player, tab_filter = st.tabs(["Turnaje", "Štatistik
 # *****************************
 # Štatistiky
 # *****************************
-with tab_stats:
+if active_tab == "Štatistiky":
     st.subheader("Štatistiky")
 
     # -- Súhrn aktuálneho filtra (len riadky; prvý riadok začína **Turnaje:**)
@@ -1373,23 +1791,17 @@ with tab_stats:
 
     # --- Filtre ---
     sel_years = years_list
-    sel_formats = set(FILTER.formats)
-    sel_teams = set(FILTER.teams)
+    sel_formats = frozenset(FILTER.formats)
+    sel_teams = frozenset(FILTER.teams)
 
-    # --- Team mapa a prepočet ---
-    player_team_map = build_player_team_map(df_matches)
-    rows_disp, rows_num = compute_stats_for_filtered(
+    # --- Prepočet (team mapu si berie compute_stats_for_filtered z cache) ---
+    df_disp, df_num = compute_stats_for_filtered(
         df_matches=df_matches,
-        sel_years=sel_years,
-        sel_formats=sel_formats,
-        sel_teams=sel_teams,
-        team_map=player_team_map,
+        sel_years=tuple(sel_years),
+        sel_formats=tuple(sorted(sel_formats)),
+        sel_teams=tuple(sorted(sel_teams)),
     )
 
-    import pandas as pd
-    df_disp = pd.DataFrame(rows_disp)
-    df_num = pd.DataFrame(rows_num)
-
     # --- Globálne: ročníky účasti hráča (nezávisle od filtra) ---
     player_years_count = build_player_years_count_display(df_matches)
     one_year_players = {p for p, cnt in player_years_count.items() if cnt == 1}
@@ -1421,33 +1833,6 @@ with tab_stats:
         st.info("Pre zvolený filter nie sú k dispozícii dáta na zobrazenie.")
     else:
         # --- DYNAMICKÉ zoradenie cez SELECTBOX (namiesto buttonov) ---
-        # Locale pre abecedné zoradenie podľa priezviska
-        import locale
-
-        def _set_sk_locale_once():
-            if 'sk_locale_ok' in st.session_state:
-                return
-            ok = False
-            for loc in ('sk_SK.UTF-8', 'sk_SK', 'Slovak_Slovakia.1250', 'cs_CZ.UTF-8', 'cs_CZ'):
-                try:
-                    locale.setlocale(locale.LC_COLLATE, loc)
-                    ok = True
-                    break
-                except Exception:
-                    pass
-            st.session_state['sk_locale_ok'] = ok
-
-        def _sk_xfrm(s: str) -> str:
-            return locale.strxfrm(s) if st.session_state.get('sk_locale_ok') else s.casefold()
-
-        def _surname(full_name: str) -> str:
-            if not isinstance(full_name, str):
-                return ''
-            parts = full_name.strip().split()
-            return parts[-1] if parts else ''
-
-        _set_sk_locale_once()
-
         # Priprav preklad z formátov na tokeny
         FORMAT_ORDER = [('Foursome', 'Fs'), ('Fourball', 'Fb'), ('Single', 'Si')]
         included = [(fmt, tag) for fmt, tag in FORMAT_ORDER if fmt in sel_formats]
@@ -1492,35 +1877,15 @@ with tab_stats:
         except ValueError:
             default_index = tokens.index("SpÚ")
 
-        # --- CSS: selectbox + tabuľka v spoločnom wrapperi so zdieľanou šírkou ---
-        STATS_FIT_CSS = r"""
-        /* Kontajner pre selectbox + tabuľku: šírka = šírka tabuľky */
-        .stats-fit {
-          display: inline-block;
-          max-width: 100%;
-          vertical-align: top;
-        }
-        /* tabuľka nech má prirodzenú šírku (určí šírku .stats-fit) */
-        .stats-fit table { width: auto !important; }
-        /* selectbox sa natiahne na 100 % šírky .stats-fit (teda = šírka tabuľky) */
-        .stats-fit [data-testid="stSelectbox"],
-        .stats-fit [data-testid="stSelectbox"] > div,
-        .stats-fit [data-baseweb="select"],
-        .stats-fit [data-baseweb="select"] > div {
-          width: 100% !important;
-          min-width: 0 !important;
-        }
-        .stats-fit [data-testid="stSelectbox"] { margin-bottom: 0.5rem; }
-        """
-        st.markdown(f"<style>{STATS_FIT_CSS}</style>", unsafe_allow_html=True)
+        # CSS pre .stats-fit (selectbox + tabuľka so zdieľanou šírkou) je v globálnom <style> bloku (STATS_FIT_CSS)
 
         # --- Začiatok spoločného wrappera (selectbox + tabuľka) ---
         st.markdown('<div class="stats-fit">', unsafe_allow_html=True)
 
+        st.session_state.setdefault("stats_hide_one_tournament", False)
         hide_one_tournament = st.checkbox(
             f"Vynechať {hidden_now} hráčov s účasťou iba na jednom turnaji",
-            key="stats_hide_one_tournament",
-            value=st.session_state.get('stats_hide_one_tournament', False),
+            key="stats_hide_one_tournament",  # hodnota len zo session_state (seed v bootstrap_filter_state)
             on_change=_save_filter_to_json,
             help="Ak je zapnuté, v Štatistikách sa skryjú hráči, ktorí sa v celej histórii zúčastnili iba 1 ročníka."
         )
@@ -1531,10 +1896,13 @@ with tab_stats:
             if not df_num.empty:
                 df_num = df_num[~df_num["Hráč"].isin(one_year_players)].copy()
         
+        # hodnotu drží len session_state (bez index=) – inak Streamlit varuje pri re-assign v PERSISTENT_WIDGET_KEYS;
+        # label mimo aktuálnej ponuky (iné formáty) nahradí východiskové zoradenie
+        if st.session_state.get("stats_sort_select") not in display_labels:
+            st.session_state["stats_sort_select"] = display_labels[default_index]
         selected_label = st.selectbox(
             "Zoradenie tabuľky",
             display_labels,
-            index=default_index,
             key="stats_sort_select",
             help=(
                 "Vyber poradie zobrazenia: Abecedne podľa priezviska, alebo podľa Body/Zápasy/Úspešnosť "
@@ -1558,16 +1926,20 @@ with tab_stats:
             st.session_state['stats_sort'] = ('Spolu Úsp.', False)
 
         sort_key, sort_asc = st.session_state['stats_sort']
+        # Triediace kľúče mien z cache pre všetkých hráčov (kľúč nezávisí od filtra);
+        # df_num má rovnaký index ako df_disp -> zoradíme df_num a df_disp len preindexujeme
+        _use_locale = _sk_locale_ok()
+        _keys = _name_sort_keys(
+            tuple(sorted(set(player_years_count) | set(df_num['Hráč'].dropna()))), _use_locale
+        )
+        _pairs = [_keys.get(n, ('', '')) for n in df_num['Hráč']]
+        df_num['_surname_key'] = [p[0] for p in _pairs]
+        df_num['_name_key'] = [p[1] for p in _pairs]
         if sort_key == 'ABC':
-            df_disp['_sort1'] = df_disp['Hráč'].apply(lambda x: _sk_xfrm(_surname(x)))
-            df_disp['_sort2'] = df_disp['Hráč'].apply(lambda x: _sk_xfrm(x))
-            df_disp.sort_values(by=['_sort1', '_sort2'], ascending=[True, True], inplace=True)
-            df_disp.drop(columns=['_sort1', '_sort2'], inplace=True)
+            order = _lexsort_order([(df_num['_surname_key'], True), (df_num['_name_key'], True)])
         else:
-            df_disp['_sort_val'] = df_num[sort_key]
-            df_disp['_sort_name'] = df_disp['Hráč'].apply(lambda x: _sk_xfrm(x))
-            df_disp.sort_values(by=['_sort_val', '_sort_name'], ascending=[sort_asc, True], inplace=True)
-            df_disp.drop(columns=['_sort_val', '_sort_name'], inplace=True)
+            order = _lexsort_order([(df_num[sort_key], sort_asc), (df_num['_name_key'], True)])
+        df_disp = df_disp.loc[df_num.index[order]]
 
         # --- Poradie stĺpcov podľa vybraných formátov (desktop vs mobil)
         # Mobil: iba P, Hráč (M. Priezvisko), T (L/R) + 1 sekcia podľa zvoleného zoradenia (Foursome/Fourball/Single/Spolu)
@@ -1664,44 +2036,14 @@ with tab_stats:
                     return None
         col_to_bold = _col_tuple_for_sort_key(sort_key)
 
-        # --- Styler pre tabuľku Štatistiky
-        def style_stats_table(df: pd.DataFrame, highlight_col=None) -> Styler:
-            header_bg = "#eeeeee"
-            styler = df.style.set_table_styles([
-                {"selector": "th", "props": f"font-weight:700; text-align:center; background-color:{header_bg};"},
-                {"selector": "th.col_heading", "props": f"font-weight:700; text-align:center; background-color:{header_bg};"},
-                {"selector": "th.col_heading.level0", "props": f"font-weight:700; text-align:center; background-color:{header_bg};"},
-                {"selector": "th.col_heading.level1", "props": f"font-weight:700; text-align:center; background-color:{header_bg};"},
-            ])
-            cols_center = [c for c in df.columns if c != ('', 'Hráč')]
-            if cols_center:
-                styler = styler.set_properties(subset=cols_center, **{"text-align": "center"})
-
-            def _row_bg(row):
-                team = str(row.get(('', 'Team'), row.get(('', 'T'), ''))).strip()
-                if team in ('Lefties','L'):
-                    bg = COLOR_LEFT_BG
-                elif team in ('Righties','R'):
-                    bg = COLOR_RIGHT_BG
-                else:
-                    bg = 'inherit'
-                return [f'background-color: {bg}'] * len(row)
-
-            styler = styler.apply(_row_bg, axis=1)
-            if highlight_col and highlight_col in df.columns:
-                styler = styler.set_properties(
-                    subset=(slice(None), [highlight_col]),
-                    **{"font-weight": "700", "font-size": "1.05rem"}
-                )
-            try:
-                styler = styler.hide(axis='index')
-            except Exception:
-                styler = styler.hide_index()
-            return styler
-
-        sty = style_stats_table(df_disp, highlight_col=col_to_bold)
-        html = sty.to_html()
-        st.markdown(html, unsafe_allow_html=True)
+        if len(df_disp) <= STATS_HTML_MAX_ROWS:
+            st.markdown(_stats_table_html(df_disp, highlight_col=col_to_bold), unsafe_allow_html=True)
+        else:
+            # Veľká tabuľka: natívny grid (virtualizovaný, triedenie v prehliadači) namiesto HTML zo Styleru.
+            # Grid nepodporuje 2-riadkovú hlavičku ani farby riadkov cez triedy -> ploché názvy stĺpcov.
+            df_grid = df_disp.copy()
+            df_grid.columns = [b if not a else f"{a} {b}" for a, b in df_grid.columns]
+            st.dataframe(df_grid, use_container_width=True, height=600, hide_index=True)
 
         # --- Koniec spoločného wrappera (select + tabuľka)
         st.markdown('</div>', unsafe_allow_html=True)
@@ -1736,37 +2078,14 @@ with tab_stats:
             rows_filter.append({"Kategória": "Formáty", "Hodnota": fmts_val})
             df_filter_export = pd.DataFrame(rows_filter, columns=["Kategória", "Hodnota"])
 
-            # 3) Zápis do Excelu + centrovanie + autofit
-            from openpyxl.utils import get_column_letter
-            from openpyxl.styles import Alignment
-            from datetime import datetime
-            import io, re
-
-            def _write_sheet_auto_fit(writer, df: pd.DataFrame, sheet_name: str):
-                df_to_save = df.copy() if (df is not None and not df.empty) else pd.DataFrame()
-                df_to_save.to_excel(writer, sheet_name=sheet_name, index=False)
-                ws = writer.sheets[sheet_name]
-                # Centrovanie buniek
-                align_center = Alignment(horizontal="center", vertical="center", wrap_text=False)
-                for r in range(1, ws.max_row + 1):
-                    for c in range(1, ws.max_column + 1):
-                        ws.cell(row=r, column=c).alignment = align_center
-                # Autofit šírky
-                if df_to_save.empty:
-                    for col_idx in range(1, max(1, ws.max_column) + 1):
-                        ws.column_dimensions[get_column_letter(col_idx)].width = 18
-                else:
-                    for col_idx, col_name in enumerate(df_to_save.columns, start=1):
-                        series = df_to_save[col_name].astype(str).fillna("")
-                        max_len = max([len(str(col_name))] + series.map(len).tolist())
-                        ws.column_dimensions[get_column_letter(col_idx)].width = min(max_len + 2, 60)
-
+            # 3) Zápis do Excelu (write-only workbook, streamované riadky) + centrovanie + autofit
             timestamp = datetime.now().strftime("%Y.%m.%d-%H.%M.%S")
             xlsx_name = f"L&R - Štatistiky ({timestamp}).xlsx"
             buffer = io.BytesIO()
-            with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
-                _write_sheet_auto_fit(writer, df_stats_export, "Štatistiky")
-                _write_sheet_auto_fit(writer, df_filter_export, "Filter")
+            wb = Workbook(write_only=True)
+            write_only_sheet(wb, df_stats_export, "Štatistiky")
+            write_only_sheet(wb, df_filter_export, "Filter")
+            wb.save(buffer)
 
             st.download_button(
                 label=f"⬇️ Export do Excelu ({xlsx_name})",
@@ -1786,7 +2105,7 @@ with tab_stats:
 # *****************************
 # Detail hráča
 # *****************************
-with tab_player:
+if active_tab == "Detail hráča":
     st.subheader("Detail hráča")
 
     # -- Súhrn aktuálneho filtra (len riadky; prvý riadok začína **Turnaje:**)
@@ -1824,22 +2143,12 @@ with tab_player:
     sel_formats = set(FILTER.formats or [])        # {'Foursome','Fourball','Single'} alebo prázdne
 
     # --- 1) Najprv zostav hráčov len podľa rokov+ tímov (NEZÁVISLE od formátov) ---
-    df_players_src = df_matches.copy()
-    if sel_years:
-        df_players_src = df_players_src[df_players_src["Rok"].isin(sel_years)]
-
-    players_set = set()
-    if "Lefties" in sel_teams:
-        for col in ("L1", "L2"):
-            if col in df_players_src.columns:
-                players_set.update(n for n in df_players_src[col].dropna().astype(str).str.strip() if n)
-
-    if "Righties" in sel_teams:
-        for col in ("R1", "R2"):
-            if col in df_players_src.columns:
-                players_set.update(n for n in df_players_src[col].dropna().astype(str).str.strip() if n)
-
-    players_sorted = sorted(players_set, key=str.casefold)
+    # hráči ako int32 kódy (stĺpce L1, L2, R1, R2; -1 = prázdny slot) – jedna maska nad (N, 4) poľom
+    player_names_idx, player_codes_all = player_codes(df_matches)
+    year_mask = df_matches["Rok"].isin(sel_years).to_numpy(dtype=bool) if sel_years else np.ones(len(df_matches), dtype=bool)
+    team_slots = [i for i, team in enumerate(("Lefties", "Lefties", "Righties", "Righties")) if team in sel_teams]
+    slot_codes = player_codes_all.to_numpy()[year_mask][:, team_slots]
+    players_sorted = sorted(player_names_idx[np.unique(slot_codes[slot_codes >= 0])], key=str.casefold)
 
     if not players_sorted:
         st.info("Pre zvolenú kombináciu **Tímy** a **Turnaje** nie je k dispozícii žiadny hráč. Uprav výber vo **Filtri**.")
@@ -1872,14 +2181,9 @@ with tab_player:
             st.info("Nie je zvolený žiadny **Formát hry**. Zapni aspoň jeden v karte **Filter**.")
         else:
             # sem patrí VÁŠ PÔVODNÝ VÝPOČET DETAILU (df_output_src, tabuľky, portrét, zápasy...)
-            df_output_src = df_matches.copy()
-            if sel_years:
-                df_output_src = df_output_src[df_output_src["Rok"].isin(sel_years)]
-            df_output_src = df_output_src[df_output_src["Formát"].isin(sel_formats)]
-
-            # ... a potom pokračuje váš kód:
-            player_team_map = build_player_team_map(df_matches)
-            player_team = player_team_map.get(selected_canonical, "Lefties")
+            df_output_src = filter_matches(df_matches, tuple(sel_years), tuple(sorted(sel_formats)))
+
+            # ... a potom pokračuje váš kód (player_team je určený vyššie z mapy v cache):
             team_badge_bg = COLOR_LEFT_BG if player_team == "Lefties" else COLOR_RIGHT_BG
 
             st.markdown(
@@ -1900,32 +2204,30 @@ with tab_player:
         # -- Všetky zápasy vybraného hráča (rešpektujú ROČNÍKY + FORMÁTY)
         # Guard: df_output_src musí existovať vždy (aj pri prázdnych formátoch)
         if 'df_output_src' not in locals():
-            df_output_src = df_matches.copy().iloc[0:0]
-        mask_player = False
-        for col in ("L1", "L2", "R1", "R2"):
-            if col in df_output_src.columns:
-                mask_player = mask_player | (df_output_src[col].astype(str).str.strip() == selected_canonical)
-        df_player = df_output_src.loc[mask_player].copy()
-
-        # -- Výpočet bodov pre hráča po riadkoch (ak je vľavo -> Lbody, ak vpravo -> Rbody)
-        def _points_for_row(row) -> float:
-            try:
-                is_left = (str(row.get("L1","")).strip() == selected_canonical) or (str(row.get("L2","")).strip() == selected_canonical)
-                is_right = (str(row.get("R1","")).strip() == selected_canonical) or (str(row.get("R2","")).strip() == selected_canonical)
-                lb = float(row.get("Lbody", 0) or 0)
-                rb = float(row.get("Rbody", 0) or 0)
-                if is_left and not is_right:
-                    return lb
-                if is_right and not is_left:
-                    return rb
-                return lb if player_team == "Lefties" else rb
-            except Exception:
-                return 0.0
-
-        if not df_player.empty:
-            df_player["_points"] = df_player.apply(_points_for_row, axis=1).astype(float)
-        else:
-            df_player["_points"] = []
+            df_output_src = df_matches.iloc[0:0]
+        # vybraný hráč ako kód (player_codes vyššie) – porovnanie čísel namiesto reťazcov
+        selected_code = int(player_names_idx.get_indexer([selected_canonical])[0])
+        if selected_code < 0:
+            selected_code = -2  # -1 sú prázdne sloty
+        src_codes = player_codes_all.loc[df_output_src.index].to_numpy()
+        mask_player = (src_codes == selected_code).any(axis=1)
+        # kópia len riadkov hráča a stĺpcov, ktoré detail číta (do df_player sa pridávajú _points/_day_int)
+        player_cols = [c for c in MATCHES_VIEW_COLS + ["Lbody", "Rbody", "L1", "L2", "R1", "R2"] if c in df_output_src.columns]
+        df_player = df_output_src.loc[mask_player, player_cols].copy()
+        player_slot_codes = src_codes[mask_player]  # zarovnané s df_player
+
+        # -- Body hráča vektorovo (ak je vľavo -> Lbody, ak vpravo -> Rbody; v oboch/nikde podľa tímu)
+        # Lbody/Rbody sú float bez NaN z prepare_matches
+        def _body(col: str) -> np.ndarray:
+            return df_player[col].to_numpy(dtype=float) if col in df_player.columns else np.zeros(len(df_player))
+
+        is_left = (player_slot_codes[:, :2] == selected_code).any(axis=1)
+        is_right = (player_slot_codes[:, 2:] == selected_code).any(axis=1)
+        lb, rb = _body("Lbody"), _body("Rbody")
+        df_player["_points"] = np.where(
+            is_left & ~is_right, lb,
+            np.where(is_right & ~is_left, rb, lb if player_team == "Lefties" else rb),
+        ).astype(float)
 
         # -- SUMÁR CELOKOM podľa formátu (Foursome/Fourball/Single) + riadok Spolu
         ORDER = ["Foursome", "Fourball", "Single"]
@@ -1937,113 +2239,87 @@ with tab_player:
         def _pct(pts: float, cnt: int) -> int:
             return int(round((pts / cnt) * 100)) if cnt else 0
 
-        agg_fmt = []
-        tot_pts = 0.0
-        tot_cnt = 0
-        for fmt in formats_in_scope:
-            sub = df_player[df_player["Formát"] == fmt] if "Formát" in df_player.columns else df_player.iloc[0:0]
-            pts = float(sub["_points"].sum()) if not sub.empty else 0.0
-            cnt = int(len(sub))
-            agg_fmt.append({"Formát": fmt, "Body": _fmt_pts(pts), "Zápasy": cnt, "Úspešnosť": f"{_pct(pts, cnt)} %"})
-            tot_pts += pts
-            tot_cnt += cnt
-
-        agg_fmt.append({"Formát": "Spolu", "Body": _fmt_pts(tot_pts), "Zápasy": tot_cnt, "Úspešnosť": f"{_pct(tot_pts, tot_cnt)} %"})
-        df_fmt_sum = pd.DataFrame(agg_fmt)
+        # jeden groupby podľa formátu (namiesto masky pre každý formát) a tabuľka zo stĺpcov
+        if "Formát" in df_player.columns and not df_player.empty:
+            g_fmt = df_player.groupby(df_player["Formát"].astype(object), sort=False)["_points"].agg(["sum", "size"])
+        else:
+            g_fmt = pd.DataFrame(columns=["sum", "size"])
+        fmt_pts = g_fmt["sum"].reindex(formats_in_scope, fill_value=0.0).astype(float).tolist()
+        fmt_cnt = g_fmt["size"].reindex(formats_in_scope, fill_value=0).astype(int).tolist()
+        fmt_pts.append(sum(fmt_pts))   # riadok Spolu
+        fmt_cnt.append(sum(fmt_cnt))
+        df_fmt_sum = pd.DataFrame({
+            "Formát": formats_in_scope + ["Spolu"],
+            "Body": [_fmt_pts(p) for p in fmt_pts],
+            "Zápasy": fmt_cnt,
+            "Úspešnosť": [f"{_pct(p, c)} %" for p, c in zip(fmt_pts, fmt_cnt)],
+        })
 
         # -- Portrét hráča (200x200) – lokálna cesta z Excelu + fallback na ANONYM_FILE
         portrait_ref = portrait_with_fallback(df_players_sheet, selected_canonical)
         if portrait_ref:
             st.image(portrait_ref, width=200)
 
-        st.markdown("### Sumár podľa formátu")
-        st.markdown(style_simple_table(df_fmt_sum, bold_last=True).to_html(), unsafe_allow_html=True)
+        st.markdown(_section_html("Sumár podľa formátu", _simple_table_html(df_fmt_sum, bold_last=True)),
+                    unsafe_allow_html=True)
 
         # -- SUMÁR podľa turnaja (Rok ↓, Rezort) + Spolu
-        rezort_map = {}
-        if not df_tournaments.empty and "Rok" in df_tournaments.columns and "Rezort" in df_tournaments.columns:
-            rezort_map = {int(r["Rok"]): str(r["Rezort"]).strip() for _, r in df_tournaments.iterrows() if pd.notna(r["Rok"])}
-
-        year_stats = {}
-        for _, r in df_player.iterrows():
-            y = int(r.get("Rok")) if pd.notna(r.get("Rok")) else None
-            if y is None:
-                continue
-            year_stats.setdefault(y, {"pts": 0.0, "cnt": 0})
-            year_stats[y]["pts"] += float(r["_points"])
-            year_stats[y]["cnt"] += 1
-
-        rows_years = []
-        y_tot_pts, y_tot_cnt = 0.0, 0
-        for y in sorted(year_stats.keys(), reverse=True):
-            pts = float(year_stats[y]["pts"]); cnt = int(year_stats[y]["cnt"])
-            rows_years.append({
-                "Rok": y,
-                "Rezort": rezort_map.get(y, ""),
-                "Body": _fmt_pts(pts),
-                "Zápasy": cnt,
-                "Úspešnosť": f"{_pct(pts, cnt)} %"
-            })
-            y_tot_pts += pts; y_tot_cnt += cnt
-
-        rows_years.append({"Rok": "", "Rezort": "Spolu", "Body": _fmt_pts(y_tot_pts), "Zápasy": y_tot_cnt, "Úspešnosť": f"{_pct(y_tot_pts, y_tot_cnt)} %"})
-        df_year_sum = pd.DataFrame(rows_years, columns=["Rok", "Rezort", "Body", "Zápasy", "Úspešnosť"])
-
-        st.markdown("### Sumár podľa turnaja")
+        rezort_map = build_rezort_map(df_tournaments)
+
+        # body + počet zápasov po rokoch jedným groupby (Rok ↓), riadok Spolu zo súčtov stĺpcov
+        if "Rok" in df_player.columns and not df_player.empty:
+            g_year = df_player.groupby("Rok", dropna=True)["_points"].agg(["sum", "size"]).sort_index(ascending=False)
+        else:
+            g_year = pd.DataFrame(columns=["sum", "size"])
+        years = [int(y) for y in g_year.index]
+        year_pts = g_year["sum"].astype(float).tolist() + [float(g_year["sum"].sum())]
+        year_cnt = g_year["size"].astype(int).tolist() + [int(g_year["size"].sum())]
+        df_year_sum = pd.DataFrame({
+            "Rok": years + [""],
+            "Rezort": [rezort_map.get(y, "") for y in years] + ["Spolu"],
+            "Body": [_fmt_pts(p) for p in year_pts],
+            "Zápasy": year_cnt,
+            "Úspešnosť": [f"{_pct(p, c)} %" for p, c in zip(year_pts, year_cnt)],
+        })
+
         df_year_sum_disp = df_year_sum.copy()
         if _device_type == 'mobil':
             df_year_sum_disp = df_year_sum_disp.rename(columns={'Body':'B','Zápasy':'Z','Úspešnosť':'Ú'})
-            st.markdown('<div class="mobile-fit">', unsafe_allow_html=True)
-        st.markdown(style_simple_table(df_year_sum_disp, bold_last=True).to_html(), unsafe_allow_html=True)
+        st.markdown(_section_html("Sumár podľa turnaja", _simple_table_html(df_year_sum_disp, bold_last=True),
+                                  mobile_fit=_device_type == 'mobil'), unsafe_allow_html=True)
         if _device_type == 'mobil':
-            st.markdown('</div>', unsafe_allow_html=True)
 
         # -- TABUĽKA PÁROV ROZDELENÁ NA 2 STĹPCE: Foursome / Fourball (iba strana vybraného hráča)
-            df_pairs = df_player[df_player["Formát"].isin(["Foursome", "Fourball"])].copy() if not df_player.empty else df_player.copy()
+            df_pairs = df_player[df_player["Formát"].isin(["Foursome", "Fourball"])].copy() if not df_player.empty else df_player
 
             if not df_pairs.empty:
                 pair_col = "Lefties" if player_team == "Lefties" else "Righties"
 
                 # Fallback – ak v dátach chýbajú Lefties/Righties, zlož ich z L1/L2 a R1/R2
                 if pair_col == "Lefties" and "Lefties" not in df_pairs.columns and {"L1", "L2"}.issubset(df_pairs.columns):
-                    df_pairs["Lefties"] = df_pairs[["L1", "L2"]].astype(str).agg(", ".join, axis=1)
+                    df_pairs["Lefties"] = df_pairs["L1"].astype(str).str.cat(df_pairs["L2"].astype(str), sep=", ")
                 if pair_col == "Righties" and "Righties" not in df_pairs.columns and {"R1", "R2"}.issubset(df_pairs.columns):
-                    df_pairs["Righties"] = df_pairs[["R1", "R2"]].astype(str).agg(", ".join, axis=1)
+                    df_pairs["Righties"] = df_pairs["R1"].astype(str).str.cat(df_pairs["R2"].astype(str), sep=", ")
 
                 # Čistič názvov dvojíc
-                def _clean_pair_name(x) -> str:
-                    if isinstance(x, (list, tuple)):
-                        return ", ".join(map(str, x)).strip()
-                    s = str(x).strip()
-                    if s.startswith("(") and s.endswith(")"):
-                        s = s[1:-1].strip()
-                    if s.endswith(","):
-                        s = s[:-1].strip()
-                    s = s.strip("'").strip('"')
-                    s = re.sub(r"\s*,\s*", ", ", s)
-                    return s
-
                 def _pairs_table_for_format(df_src: pd.DataFrame, fmt_name: str) -> pd.DataFrame:
-                    sub = df_src[df_src["Formát"] == fmt_name].copy()
+                    sub = df_src[df_src["Formát"] == fmt_name]  # len čítanie -> bez kópie
                     if sub.empty:
                         return pd.DataFrame(columns=[pair_col, "Body", "Zápasy", "Úspešnosť"])
 
-                    g = sub.groupby([pair_col], dropna=False)
-                    rows = []
-                    tot_pts, tot_cnt = 0.0, 0
-                    for pnames, grp in g:
-                        pts = float(grp["_points"].sum())
-                        cnt = int(len(grp))
-                        succ = int(round((pts / cnt) * 100)) if cnt else 0
-                        rows.append({pair_col: pnames, "_Body_num": pts, "_Zápasy_num": cnt, "_Úspešnosť_num": succ})
-                        tot_pts += pts
-                        tot_cnt += cnt
-
-                    out = pd.DataFrame(rows)
+                    # body + počet zápasov jedným groupby, úspešnosť ako stĺpcová operácia
+                    out = sub.groupby(pair_col, dropna=False, sort=False).agg(
+                        _Body_num=("_points", "sum"), _Zápasy_num=("_points", "size"),
+                    ).reset_index()
+                    cnt = out["_Zápasy_num"].to_numpy(dtype=int)
+                    out["_Úspešnosť_num"] = np.where(
+                        cnt > 0, np.round(out["_Body_num"].to_numpy(dtype=float) / np.where(cnt > 0, cnt, 1) * 100), 0
+                    ).astype(int)
+                    tot_pts, tot_cnt = float(out["_Body_num"].sum()), int(cnt.sum())
                     if out.empty:
                         return pd.DataFrame(columns=[pair_col, "Body", "Zápasy", "Úspešnosť"])
 
-                    out[pair_col] = out[pair_col].apply(_clean_pair_name)
+                    out[pair_col] = clean_pair_names(out[pair_col])
                     out.sort_values(by=["_Úspešnosť_num", "_Body_num"], ascending=[False, False], inplace=True)
 
                     def _fmt_pts(x: float) -> str:
@@ -2066,18 +2342,20 @@ with tab_player:
 
                 c1, c2 = st.columns(2)
                 with c1:
-                    st.markdown("### Dvojice Foursome")
                     if df_pairs_fs.empty:
+                        st.markdown("### Dvojice Foursome")
                         st.info("Žiadne párové zápasy vo formáte **Foursome**.")
                     else:
-                        st.markdown(style_simple_table(df_pairs_fs, bold_last=True).to_html(), unsafe_allow_html=True)
+                        st.markdown(_section_html("Dvojice Foursome", _simple_table_html(df_pairs_fs, bold_last=True)),
+                                    unsafe_allow_html=True)
 
                 with c2:
-                    st.markdown("### Dvojice Fourball")
                     if df_pairs_fb.empty:
+                        st.markdown("### Dvojice Fourball")
                         st.info("Žiadne párové zápasy vo formáte **Fourball**.")
                     else:
-                        st.markdown(style_simple_table(df_pairs_fb, bold_last=True).to_html(), unsafe_allow_html=True)
+                        st.markdown(_section_html("Dvojice Fourball", _simple_table_html(df_pairs_fb, bold_last=True)),
+                                    unsafe_allow_html=True)
             else:
                 st.info("Hráč neodohral žiadne zápasy formátov **Foursome/Fourball** v zvolených rokoch.")
 
@@ -2086,90 +2364,48 @@ with tab_player:
             opp_cols = ["R1", "R2"] if player_team == "Lefties" else ["L1", "L2"]
 
             if not df_player.empty:
-                # nazbieraj W/D/L + body a počty zápasov proti jednotlivým súperom
-                # kľúč = celé meno protihráča v kanonickej podobe z dát (Priezvisko Meno)
-                agg = {}  # {opp_name: {"wins":int, "draws":int, "losses":int, "pts":float, "cnt":int}}
-
-                for _, row in df_player.iterrows():
-                    # zistime stranu vybraného hráča v danom zápase
-                    is_left = (str(row.get("L1","")).strip() == selected_canonical) or (str(row.get("L2","")).strip() == selected_canonical)
-                    is_right = (str(row.get("R1","")).strip() == selected_canonical) or (str(row.get("R2","")).strip() == selected_canonical)
-
-                    # body strán v danom zápase (na istotu ako float)
-                    lb = float(row.get("Lbody", 0) or 0.0)
-                    rb = float(row.get("Rbody", 0) or 0.0)
-
-                    # hráčove body a súperove body (z pohľadu výsledku)
-                    if is_left and not is_right:
-                        my_pts = lb
-                        opp_pts = rb
-                        opponents = [row.get("R1", None), row.get("R2", None)]
-                    elif is_right and not is_left:
-                        my_pts = rb
-                        opp_pts = lb
-                        opponents = [row.get("L1", None), row.get("L2", None)]
-                    else:
-                        # fallback (nemalo by sa stať): využi vypočítané _points a opačnú stranu podľa player_team
-                        my_pts = float(row.get("_points", 0.0) or 0.0)
-                        opponents = [row.get(c, None) for c in (opp_cols)]
-                        opp_pts = rb if player_team == "Lefties" else lb
-
-                    # urč výsledok W/D/L pre tento riadok
-                    if my_pts > opp_pts:
-                        res = "win"
-                    elif my_pts < opp_pts:
-                        res = "loss"
-                    else:
-                        res = "draw"
-
-                    # zozbieraj mená súperov (ignoruj NaN/prázdne), každý dostane rovnaký výsledok
-                    for nm in opponents:
-                        if pd.isna(nm) or str(nm).strip() == "":
-                            continue
-                        opp_name = str(nm).strip()
-                        bucket = agg.setdefault(opp_name, {"wins": 0, "draws": 0, "losses": 0, "pts": 0.0, "cnt": 0})
-                        # výsledok
-                        if res == "win":
-                            bucket["wins"] += 1
-                        elif res == "loss":
-                            bucket["losses"] += 1
-                        else:
-                            bucket["draws"] += 1
-                        # body + zápasy z pohľadu vybraného hráča
-                        bucket["pts"] += my_pts
-                        bucket["cnt"] += 1
-
-                # zostav DataFrame
-                rows = []
-                tot_pts, tot_cnt = 0.0, 0
-                tot_w, tot_d, tot_l = 0, 0, 0
-                for opp, d in agg.items():
-                    pts = float(d["pts"])
-                    cnt = int(d["cnt"])
-                    w, d_, l = int(d["wins"]), int(d["draws"]), int(d["losses"])
-                    succ = int(round((pts / cnt) * 100)) if cnt else 0
-                    rows.append({
-                        "Protihráč": to_firstname_first(opp),   # celé meno (Meno Priezvisko)
-                        "Výhra": w,
-                        "Remíza": d_,
-                        "Prehra": l,
-                        "_Body_num": pts,
-                        "_Zápasy_num": cnt,
-                        "_Úspešnosť_num": succ,
-                    })
-                    tot_pts += pts
-                    tot_cnt += cnt
-                    tot_w += w
-                    tot_d += d_
-                    tot_l += l
-
-                import pandas as pd
-                df_opp = pd.DataFrame(rows)
-
-                # Nadpis tabuľky zobraziť priamo s menom hráča
-                st.markdown(f"### {selected_display} a protihráči")
+                # W/D/L + body a počty zápasov proti jednotlivým súperom – vektorovo z masiek strán (is_left/is_right,
+                # lb/rb z výpočtu _points vyššie, zarovnané s df_player); kľúč = int32 kód hráča
+                left_only, right_only = is_left & ~is_right, is_right & ~is_left
+                my_pts = df_player["_points"].to_numpy(dtype=float)
+                opp_pts = np.where(left_only, rb, np.where(right_only, lb, rb if player_team == "Lefties" else lb))
+                # súperi z pravej strany, ak je hráč vľavo (fallback: podľa tímu, ako opp_cols)
+                opp_right = left_only | (~right_only & (player_team == "Lefties"))
+
+                sc = player_slot_codes  # stĺpce L1, L2, R1, R2
+                win = (my_pts > opp_pts).astype(int)
+                loss = (my_pts < opp_pts).astype(int)
+                # W/D/L, body a počty na súpera cez np.bincount nad kódmi (dva sloty súperov na zápas)
+                opp = np.concatenate([np.where(opp_right, sc[:, 2], sc[:, 0]),
+                                      np.where(opp_right, sc[:, 3], sc[:, 1])])
+                valid = opp >= 0  # prázdne sloty majú kód -1
+                opp = opp[valid]
+                n_players = len(player_names_idx)
+
+                def _tally(values: np.ndarray) -> np.ndarray:
+                    return np.bincount(opp, weights=np.tile(values, 2)[valid], minlength=n_players)
+
+                opp_cnt_all = np.bincount(opp, minlength=n_players)
+                seen = np.flatnonzero(opp_cnt_all)
+
+                # zostav DataFrame zo stĺpcov
+                opp_pts_sum = _tally(my_pts)[seen]
+                opp_cnt = opp_cnt_all[seen]
+                df_opp = pd.DataFrame({
+                    "Protihráč": [to_firstname_first(o) for o in player_names_idx[seen]],   # kód -> celé meno (Meno Priezvisko)
+                    "Výhra": _tally(win)[seen].astype(int),
+                    "Remíza": _tally(1 - win - loss)[seen].astype(int),
+                    "Prehra": _tally(loss)[seen].astype(int),
+                    "_Body_num": opp_pts_sum,
+                    "_Zápasy_num": opp_cnt,
+                    "_Úspešnosť_num": np.round(opp_pts_sum / np.where(opp_cnt > 0, opp_cnt, 1) * 100).astype(int),
+                })
+
+                # Nadpis tabuľky zobraziť priamo s menom hráča (pri dátach spolu s tabuľkou v jednom markdowne)
+                opp_title = f"{selected_display} a protihráči"
 
                 if df_opp.empty:
+                    st.markdown(f"### {opp_title}")
                     st.info("V zvolených zápasoch sa nenašli žiadni protihráči.")
                 else:
                     # zoradenie: Úspešnosť ↓, Body ↓, Protihráč ↑
@@ -2193,13 +2429,14 @@ with tab_player:
                     df_opp_export = df_opp_disp.copy()
                     if _device_type == 'mobil':
                         df_opp_disp['Protihráč'] = df_opp_disp['Protihráč'].apply(short_name_msurname)
-                        df_opp_disp['V-A/S-P'] = df_opp_disp.apply(lambda rr: str(int(rr['Výhra']))+'-'+str(int(rr['Remíza']))+'-'+str(int(rr['Prehra'])), axis=1)
+                        # spojenie stĺpcov vektorovo (namiesto apply(axis=1) po riadkoch)
+                        df_opp_disp['V-A/S-P'] = (df_opp_disp['Výhra'].astype(int).astype(str) + '-'
+                                                  + df_opp_disp['Remíza'].astype(int).astype(str) + '-'
+                                                  + df_opp_disp['Prehra'].astype(int).astype(str))
                         df_opp_disp = df_opp_disp.rename(columns={'Body':'B','Zápasy':'Z','Úspešnosť':'Ú'})
                         df_opp_disp = df_opp_disp[["Protihráč", "V-A/S-P", "B", "Z", "Ú"]]
-                        st.markdown('<div class="mobile-fit">', unsafe_allow_html=True)
-                    st.markdown(style_simple_table(df_opp_disp, bold_last=False).to_html(), unsafe_allow_html=True)
-                    if _device_type == 'mobil':
-                        st.markdown('</div>', unsafe_allow_html=True)
+                    st.markdown(_section_html(opp_title, _simple_table_html(df_opp_disp, bold_last=False),
+                                              mobile_fit=_device_type == 'mobil'), unsafe_allow_html=True)
             else:
                 st.info("Hráč nemá v zvolených **rokoch** a vybraných **formátoch** žiadne zápasy (pre výpočet protihráčov).")
         
@@ -2207,20 +2444,19 @@ with tab_player:
             
             # -- ZÁPASY: zoradenie Rok ↓, Deň ↑, Zápas ↑ a render
             if not df_player.empty:
-                if "Rok" in df_player.columns:
-                    df_player["Rok"] = pd.to_numeric(df_player["Rok"], errors="coerce").astype("Int64")
+                # Rok je už Int64 z prepare_matches
                 if "Deň" in df_player.columns:
                     day_clean = df_player["Deň"].astype(str).str.strip().str.replace(r"\.$", "", regex=True)
                     df_player["_day_int"] = pd.to_numeric(day_clean, errors="coerce").fillna(0).astype(int)
                 else:
                     df_player["_day_int"] = 0
 
-                by = []; ascending = []
-                if "Rok" in df_player.columns: by.append("Rok"); ascending.append(False)   # desc
-                by.append("_day_int"); ascending.append(True)
-                if "Zápas" in df_player.columns: by.append("Zápas"); ascending.append(True)
+                keys = []
+                if "Rok" in df_player.columns: keys.append((df_player["Rok"], False))   # desc
+                keys.append((df_player["_day_int"], True))
+                if "Zápas" in df_player.columns: keys.append((df_player["Zápas"], True))
 
-                df_player.sort_values(by=by, ascending=ascending, inplace=True)
+                df_player = df_player.take(_lexsort_order(keys))
                 df_player.drop(columns=["_day_int"], inplace=True, errors="ignore")
 
                 wanted_cols = ["Rok", "Deň", "Zápas", "Formát", "Lefties", "Righties", "Víťaz"]
@@ -2259,41 +2495,13 @@ with tab_player:
                     cols = ['Zápas'] + [c for c in ['Lefties','Righties','V','A/S'] if c in mv.columns]
                     matches_view = mv[cols].copy()
                 
-                sty = style_matches_table(matches_view)
-                st.markdown("### Zápasy")
-                if _device_type == 'mobil':
-                    st.markdown('<div class="mobile-fit">', unsafe_allow_html=True)
-                st.markdown(sty.to_html(), unsafe_allow_html=True)
-                if _device_type == 'mobil':
-                    st.markdown('</div>', unsafe_allow_html=True)
+                st.markdown(_section_html("Zápasy", _matches_table_html(matches_view),
+                                          mobile_fit=_device_type == 'mobil'), unsafe_allow_html=True)
             else:
                 st.info("Hráč nemá v zvolených **rokoch** a vybraných **formátoch** žiadne zápasy.")
 
             # --- Export DETAIL HRÁČA do Excelu (1 hárok na každú tabuľku + Filter) ---
             try:
-                # 0) Helper: zápis DF do hárka + centrovanie + autofit
-                def _write_sheet_auto_fit(writer, df: pd.DataFrame, sheet_name: str, default_cols: list[str] | None = None):
-                    # ak DF chýba / je prázdny, založ prázdny s očakávanými hlavičkami (nech je štruktúra stabilná)
-                    if df is None or df.empty:
-                        df_to_save = pd.DataFrame(columns=default_cols or [])
-                    else:
-                        df_to_save = df.copy()
-
-                    df_to_save.to_excel(writer, sheet_name=sheet_name, index=False)
-                    ws = writer.sheets[sheet_name]
-
-                    # centrovanie všetkých buniek (hlavička + dáta)
-                    align_center = Alignment(horizontal="center", vertical="center", wrap_text=False)
-                    for r in range(1, ws.max_row + 1):
-                        for c in range(1, ws.max_column + 1):
-                            ws.cell(row=r, column=c).alignment = align_center
-
-                    # autofit šírky: max(dĺžka hlavičky, dĺžka obsahu) + padding
-                    for col_idx, col_name in enumerate(df_to_save.columns, start=1):
-                        series = df_to_save[col_name].astype(str).fillna("")
-                        max_len = max([len(str(col_name))] + series.map(len).tolist()) if not series.empty else len(str(col_name))
-                        ws.column_dimensions[get_column_letter(col_idx)].width = min(max_len + 2, 60)  # bezpečnostný limit
-
                 # 1) Priprav mapu -> DF pre všetky tabuľky v Detaily hráča
                 # Pozn.: Niektoré premenne vznikajú len ak existujú dáta – preto používame locals().get(...)
                 pair_col_name = "Lefties" if player_team == "Lefties" else "Righties"
@@ -2338,13 +2546,19 @@ with tab_player:
                 xlsx_name = f"LR - {safe_player} - {timestamp}.xlsx"
 
                 # 5) Export do pamäte a download tlačidlo
+                # prázdny/chýbajúci DF -> prázdny hárok s očakávanými hlavičkami (nech je štruktúra stabilná)
+                def _or_default(df: pd.DataFrame | None, sheet_name: str) -> pd.DataFrame:
+                    if df is None or df.empty:
+                        return pd.DataFrame(columns=defaults.get(sheet_name) or [])
+                    return df
+
                 buffer = io.BytesIO()
-                with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
-                    # najprv všetky tabuľky
-                    for sheet_name, df_ in sheets.items():
-                        _write_sheet_auto_fit(writer, df_, sheet_name, default_cols=defaults.get(sheet_name))
-                    # nakoniec FILTER
-                    _write_sheet_auto_fit(writer, df_filter_export, "Filter", default_cols=defaults["Filter"])
+                wb = Workbook(write_only=True)
+                # najprv všetky tabuľky, nakoniec FILTER
+                for sheet_name, df_ in sheets.items():
+                    write_only_sheet(wb, _or_default(df_, sheet_name), sheet_name)
+                write_only_sheet(wb, _or_default(df_filter_export, "Filter"), "Filter")
+                wb.save(buffer)
 
                 st.download_button(
                     label=f"⬇️ Export detailu hráča do Excelu ({xlsx_name})",
@@ -2362,204 +2576,206 @@ with tab_player:
 
 
 
-# *****************************
-# Turnaje
-# *****************************
-with tab_turnaje:
-    st.subheader("Turnaje")
-    tdf = df_tournaments.copy()
-    if "Rok" in tdf.columns:
-        tdf.sort_values("Rok", ascending=False, inplace=True)
+@st.fragment
+def _render_year_panel(year: int) -> None:
+    """Rozbalený turnaj (logo, výsledok, tímy, zápasy, export, fotka) ako fragment –
+    interakcia vo vnútri panelu (napr. príprava exportu) prekreslí len tento panel, nie celú appku.
+    Metadáta turnaja aj zápasy si panel vytiahne z cache podľa roku."""
+    t = _tournaments_by_year(df_tournaments, df_matches)[year]
+    rezort = str(t.get('Rezort', '')).strip()
+    l_captain, r_captain = t['__Lcap'], t['__Rcap']   # už 'Meno Priezvisko'
+    year_pos = _year_positional_index(df_matches).get(year)
+    df_year = df_matches.take(year_pos) if year_pos is not None else df_matches.iloc[0:0]
 
-    if 'open_year' not in st.session_state:
-        st.session_state['open_year'] = None
+    # Názvy tabuliek/hárkov a kľúč download tlačidla – raz pre daný rok (nadpisy aj export)
+    sheet_left_name = f"Team Lefties {year}"
+    sheet_right_name = f"Team Righties {year}"
+    sheet_games_name = f"Zápasy {year}"
+    dl_key = f"dl_xlsx_{year}"
 
-    for _, t in tdf.iterrows():
-        year = int(t.get('Rok')) if pd.notna(t.get('Rok')) else None
-        rezort = str(t.get('Rezort', '')).strip()
-        l_captain = str(t.get('L-Captain', '')).strip()
-        r_captain = str(t.get('R-Captain', '')).strip()
-        winner_val = str(t.get('Víťaz', '')).strip().lower()
-        btn_icon = '🔵' if winner_val == 'lefties' else ('🔴' if winner_val == 'righties' else '⚪')
-        btn_label = f"{btn_icon}    {year}     {rezort}"
-        clicked = st.button(btn_label, key=f"btn_{year}")
-        if clicked:
-            st.session_state['open_year'] = year if st.session_state.get('open_year') != year else None
-        if st.session_state.get('open_year') == year:
-            logo_url = str(t.get('Logo', '')).strip()
-            if logo_url:
-                st.image(logo_url, width=240)
-
-            df_y = df_matches[df_matches['Rok'] == year].copy()
-            l_total = float(df_y['Lbody'].fillna(0).sum()) if 'Lbody' in df_y.columns else 0.0
-            r_total = float(df_y['Rbody'].fillna(0).sum()) if 'Rbody' in df_y.columns else 0.0
-
-            def _fmt(v: float) -> str:
-                return f"{int(v)}" if float(v).is_integer() else f"{v:.1f}"
-
-            st.markdown(f"**Výsledok turnaja {year}:** Lefties **{_fmt(l_total)}** : **{_fmt(r_total)}** Righties")
-
-            val_L = t.get('StavL', t.get('Stav L', None))
-            val_R = t.get('StavR', t.get('Stav R', None))
-            try:
-                val_L = float(val_L) if val_L is not None else 0.0
-            except Exception:
-                val_L = 0.0
+    logo_url = t.get('Logo', '')
+    logo_url = logo_url.strip() if isinstance(logo_url, str) else ''
+    if logo_url:
+        # URL ide priamo do st.image – logo načíta prehliadač (server ho nesťahuje, rerun neblokuje)
+        st.image(logo_url, width=240)
+
+    df_y = df_year  # take() už vrátil nový DF, panel ho len číta
+    l_total, r_total = t['__Ltotal'], t['__Rtotal']
+    val_L, val_R = t['__StavL'], t['__StavR']
+    # výsledok aj konečný stav v jednom elemente (tvrdý zlom riadku cez dve medzery)
+    st.markdown(
+        f"**Výsledok turnaja {year}:** Lefties **{_fmt(l_total)}** : **{_fmt(r_total)}** Righties  \n"
+        f"**Stav na konci turnaja {year}:** Lefties **{_fmt(val_L)}** : **{_fmt(val_R)}** Righties"
+    )
+
+    left_players, right_players = players_for_year_pairs_only(df_y)
+    left_table = build_team_table(df_y, left_players, side='L')
+    right_table = build_team_table(df_y, right_players, side='R')
+    c1, c2 = st.columns(2)
+    with c1:
+        st.markdown(f"### {sheet_left_name}  \n(kapitán: {l_captain})")
+        if not left_table.empty:
+            if _device_type == "mobil" and "Hráč" in left_table.columns:
+                left_table = left_table.copy()
+                left_table["Hráč"] = left_table["Hráč"].apply(short_name_msurname)
+            show_team_table(left_table, "L")
+        else:
+            st.info("Pre tento rok nie sú v dátach hráči tímu Lefties.")
+    with c2:
+        st.markdown(f"### {sheet_right_name}  \n(kapitán: {r_captain})")
+        if not right_table.empty:
+            if _device_type == "mobil" and "Hráč" in right_table.columns:
+                right_table = right_table.copy()
+                right_table["Hráč"] = right_table["Hráč"].apply(short_name_msurname)
+            show_team_table(right_table, "R")
+        else:
+            st.info("Pre tento rok nie sú v dátach hráči tímu Righties.")
+
+    st.markdown("---")
+    # len stĺpce tabuľky zápasov z výrezu roka (df_year už máme cez _year_positional_index)
+    matches_view = df_year[[c for c in MATCHES_VIEW_COLS if c in df_year.columns]].reset_index(drop=True)
+    # Pre export: vždy desktop reprezentácia (aj na mobile); mobilná vetva pracuje na kópii
+    matches_view_export = matches_view
+    # Turnaje: vždy všetky zápasy za vybraný rok (ignoruje Filter aj Detail hráča)
+
+    if _device_type == 'mobil':
+        mv = matches_view.copy()
+        fmt_map = {'Foursome':'Fs','Fourball':'Fb','Single':'S'}
+
+        def _int_str(v):
             try:
-                val_R = float(val_R) if val_R is not None else 0.0
+                return str(int(float(v)))
             except Exception:
-                val_R = 0.0
-            st.markdown(f"**Stav na konci turnaja {year}:** Lefties **{_fmt(val_L)}** : **{_fmt(val_R)}** Righties")
-
-            df_y = df_matches[df_matches['Rok'] == year].copy()
-            left_players, right_players = players_for_year_pairs_only(df_y)
-            left_table = build_team_table(df_y, left_players, side='L')
-            right_table = build_team_table(df_y, right_players, side='R')
-            c1, c2 = st.columns(2)
-            with c1:
-                st.markdown(f"### Team Lefties {year}  \n(kapitán: {to_firstname_first(l_captain)})")
-                if not left_table.empty:
-                    if _device_type == "mobil" and "Hráč" in left_table.columns:
-                        left_table = left_table.copy()
-                        left_table["Hráč"] = left_table["Hráč"].apply(short_name_msurname)
-                    sty = style_team_table(left_table, "L")
-                    st.markdown(f"{sty.to_html()}", unsafe_allow_html=True)
-                else:
-                    st.info("Pre tento rok nie sú v dátach hráči tímu Lefties.")
-            with c2:
-                st.markdown(f"### Team Righties {year}  \n(kapitán: {to_firstname_first(r_captain)})")
-                if not right_table.empty:
-                    if _device_type == "mobil" and "Hráč" in right_table.columns:
-                        right_table = right_table.copy()
-                        right_table["Hráč"] = right_table["Hráč"].apply(short_name_msurname)
-                    sty = style_team_table(right_table, "R")
-                    st.markdown(f"{sty.to_html()}", unsafe_allow_html=True)
-                else:
-                    st.info("Pre tento rok nie sú v dátach hráči tímu Righties.")
-
-            st.markdown("---")
-            wanted_cols = ["Rok", "Deň", "Zápas", "Formát", "Lefties", "Righties", "Víťaz", "A/S"]
-            cols_present = [c for c in wanted_cols if c in df_y.columns]
-            matches_view = df_y[cols_present].copy()
-            # Pre export: vždy desktop reprezentácia (aj na mobile)
-            matches_view_export = matches_view.copy()
-            # Turnaje: vždy všetky zápasy za vybraný rok (ignoruje Filter aj Detail hráča)
-
-            if _device_type == 'mobil':
-                mv = matches_view.copy()
-                fmt_map = {'Foursome':'Fs','Fourball':'Fb','Single':'S'}
-
-                def _int_str(v):
-                    try:
-                        return str(int(float(v)))
-                    except Exception:
-                        s = str(v).strip()
-                        return s.replace('.', '') if s.endswith('.') else s
-
-                f_abbr = mv['Formát'].astype(str).map(lambda x: fmt_map.get(x, x)) if 'Formát' in mv.columns else ''
-                mv['Zápas'] = mv['Deň'].map(_int_str) + '-' + mv['Zápas'].map(_int_str) + '-' + f_abbr
-
-                # ❗Lefties/Righties nechaj ako desktop (bez skratiek mien)
-                # if 'Lefties' in mv.columns: mv['Lefties'] = mv['Lefties'].apply(short_pair_names)
-                # if 'Righties' in mv.columns: mv['Righties'] = mv['Righties'].apply(short_pair_names)
-
-                # Víťaz skráť na V a hodnoty Lefties/Righties na L/R ponechaj
-                if 'Víťaz' in mv.columns:
-                    mv['Víťaz'] = mv['Víťaz'].astype(str).str.replace('Lefties','L').str.replace('Righties','R')
-                    mv.rename(columns={'Víťaz': 'V'}, inplace=True)
-
-                # ✅ Stĺpce ponechaj: Zápas, Lefties, Righties, V, A/S
-                cols = ['Zápas'] + [c for c in ['Lefties','Righties','V','A/S'] if c in mv.columns]
-                matches_view = mv[cols].copy()
-
-                st.markdown(f"### Zápasy {year}")
-            sty = style_matches_table(matches_view)
-            if _device_type == 'mobil':
-                st.markdown('<div class="mobile-fit">', unsafe_allow_html=True)
-            st.markdown(sty.to_html(), unsafe_allow_html=True)
-            if _device_type == 'mobil':
-                st.markdown('</div>', unsafe_allow_html=True)
-
-            # --- Export do Excelu: Team Lefties {year}, Team Righties {year}, Zápasy {year} ---
+                s = str(v).strip()
+                return s.replace('.', '') if s.endswith('.') else s
+
+        f_abbr = mv['Formát'].astype(str).map(lambda x: fmt_map.get(x, x)) if 'Formát' in mv.columns else ''
+        mv['Zápas'] = mv['Deň'].map(_int_str) + '-' + mv['Zápas'].map(_int_str) + '-' + f_abbr
+
+        # ❗Lefties/Righties nechaj ako desktop (bez skratiek mien)
+        # if 'Lefties' in mv.columns: mv['Lefties'] = mv['Lefties'].apply(short_pair_names)
+        # if 'Righties' in mv.columns: mv['Righties'] = mv['Righties'].apply(short_pair_names)
+
+        # Víťaz skráť na V a hodnoty Lefties/Righties na L/R ponechaj
+        if 'Víťaz' in mv.columns:
+            mv['Víťaz'] = mv['Víťaz'].astype(str).str.replace('Lefties','L').str.replace('Righties','R')
+            mv.rename(columns={'Víťaz': 'V'}, inplace=True)
+
+        # ✅ Stĺpce ponechaj: Zápas, Lefties, Righties, V, A/S
+        cols = ['Zápas'] + [c for c in ['Lefties','Righties','V','A/S'] if c in mv.columns]
+        matches_view = mv[cols].copy()
+
+    # Nadpis (mobil), wrapper a tabuľka zápasov ako jeden markdown
+    matches_html = _matches_table_html(matches_view)
+    if _device_type == 'mobil':
+        matches_html = _section_html(sheet_games_name, matches_html, mobile_fit=True)
+    st.markdown(matches_html, unsafe_allow_html=True)
+
+    # --- Export do Excelu: Team Lefties {year}, Team Righties {year}, Zápasy {year} ---
+    # Export je v expanderi a XLSX sa zostaví až na požiadanie (tlačidlo) – bežné reruny ho nestavajú.
+    # Hotový súbor držíme v session_state, aby download tlačidlo prežilo ďalšie reruny.
+    xlsx_state_key = f"xlsx_export_{year}"
+    with st.expander("Export do Excelu", expanded=False):
+        if st.button("Pripraviť súbor", key=f"prep_{year}"):
+            # Priprav názov súboru: L&R {Rok} {Rezort}.xlsx (bez neplatných znakov)
+            safe_rezort = re.sub(r'[\\/:*?"<>|]+', ' ', rezort).strip()
+            timestamp = datetime.now().strftime("%Y.%m.%d-%H.%M.%S")
+            xlsx_name = f"L&R - {year} - {safe_rezort} ({timestamp}).xlsx"
+
+            # Ak je DF prázdny, exportuj aspoň hlavičky (nech má hárok konzistentnú štruktúru)
+            def _export_frame(df: pd.DataFrame, sheet_name: str) -> pd.DataFrame:
+                if df is None or df.empty:
+                    if sheet_name.startswith("Team "):
+                        return pd.DataFrame(columns=["Hráč", "Body", "Zápasy", "Úspešnosť"])
+                    return pd.DataFrame(columns=["Rok", "Deň", "Zápas", "Formát", "Lefties", "Righties", "Víťaz"])
+                return df.copy()
+
+            # Zostav DF pre export
+            sheet_left  = left_table.copy()  if 'left_table'  in locals() else pd.DataFrame()
+            sheet_right = right_table.copy() if 'right_table' in locals() else pd.DataFrame()
+            sheet_games = matches_view_export.copy() if 'matches_view_export' in locals() else (matches_view.copy() if 'matches_view' in locals() else pd.DataFrame())
+
+            # (Voliteľné) zoradenie stĺpcov, ak by DF prišli v inom poradí
+            # Team hárky: Hráč, Body, Zápasy, Úspešnosť
+            for _df in (sheet_left, sheet_right):
+                if not _df.empty:
+                    cols = [c for c in ["Hráč","Body","Zápasy","Úspešnosť"] if c in _df.columns]
+                    if cols:
+                        _df = _df[cols]
+            # Zápasy: Rok, Deň, Zápas, Formát, Lefties, Righties, Víťaz
+            if not sheet_games.empty:
+                cols = [c for c in ["Rok","Deň","Zápas","Formát","Lefties","Righties","Víťaz"] if c in sheet_games.columns]
+                if cols:
+                    sheet_games = sheet_games[cols]
+
+            sheets_out = [
+                (sheet_left_name, sheet_left),
+                (sheet_right_name, sheet_right),
+                (sheet_games_name, sheet_games),
+            ]
+            sheets_out = [(name, _export_frame(df_, name)) for name, df_ in sheets_out]
+
+            # Šírky stĺpcov sú nezávislé pre každý hárok -> počítame ich paralelne;
+            # samotný zápis do jedného workbooku ostáva sekvenčný (openpyxl nie je thread-safe)
+            with ThreadPoolExecutor(max_workers=len(sheets_out)) as pool:
+                widths_out = list(pool.map(_excel_col_widths, [df_ for _, df_ in sheets_out]))
+
+            # Export do pamäte – zachytávame len známe chyby zápisu (XLSX_EXPORT_ERRORS)
+            # Write-only workbook: riadky sa serializujú priebežne, pamäť nerastie s veľkosťou hárku
+            xlsx_data = None
             try:
-                # Priprav názov súboru: L&R {Rok} {Rezort}.xlsx (bez neplatných znakov)
-                safe_rezort = re.sub(r'[\\/:*?"<>|]+', ' ', rezort).strip()
-                timestamp = datetime.now().strftime("%Y.%m.%d-%H.%M.%S")
-                xlsx_name = f"L&R - {year} - {safe_rezort} ({timestamp}).xlsx"
+                xlsx_data = workbook_bytes(sheets_out, widths_out)
+            except XLSX_EXPORT_ERRORS as _ex:
+                st.warning(f"Export do Excelu sa nepodaril: {type(_ex).__name__}: {_ex}")
 
-                # Funkcia na export DF -> hárok + autofit stĺpcov
-                def _write_sheet_auto_fit(writer, df: pd.DataFrame, sheet_name: str):
-                    # Ak je DF prázdny, exportuj aspoň hlavičky (nech má hárok konzistentnú štruktúru)
-                    if df is None or df.empty:
-                        if sheet_name.startswith("Team "):
-                            df_export = pd.DataFrame(columns=["Hráč", "Body", "Zápasy", "Úspešnosť"])
-                        else:
-                            df_export = pd.DataFrame(columns=["Rok", "Deň", "Zápas", "Formát", "Lefties", "Righties", "Víťaz"])
-                    else:
-                        df_export = df.copy()
-
-                    # Zapíš dáta
-                    df_export.to_excel(writer, sheet_name=sheet_name, index=False)
-
-                    # Vezmi worksheet a centrovanie + autofit
-                    ws = writer.sheets[sheet_name]
-
-                    # 1) Centrovanie všetkých buniek (hlavičky aj obsah)
-                    align_center = Alignment(horizontal="center", vertical="center", wrap_text=False)
-                    max_row = ws.max_row
-                    max_col = ws.max_column
-                    for r in range(1, max_row + 1):
-                        for c in range(1, max_col + 1):
-                            ws.cell(row=r, column=c).alignment = align_center
-
-                    # 2) Auto-fit šírky stĺpcov podľa najdlhšieho textu v stĺpci (vrátane hlavičky)
-                    for col_idx, col_name in enumerate(df_export.columns, start=1):
-                        series = df_export[col_name].astype(str).fillna("")
-                        max_len = max([len(str(col_name))] + series.map(len).tolist())
-                        ws.column_dimensions[get_column_letter(col_idx)].width = min(max_len + 2, 60)  # bezpečnostný limit
-        
-                # Zostav DF pre export
-                sheet_left  = left_table.copy()  if 'left_table'  in locals() else pd.DataFrame()
-                sheet_right = right_table.copy() if 'right_table' in locals() else pd.DataFrame()
-                sheet_games = matches_view_export.copy() if 'matches_view_export' in locals() else (matches_view.copy() if 'matches_view' in locals() else pd.DataFrame())
-
-                # (Voliteľné) zoradenie stĺpcov, ak by DF prišli v inom poradí
-                # Team hárky: Hráč, Body, Zápasy, Úspešnosť
-                for _df in (sheet_left, sheet_right):
-                    if not _df.empty:
-                        cols = [c for c in ["Hráč","Body","Zápasy","Úspešnosť"] if c in _df.columns]
-                        if cols:
-                            _df = _df[cols]
-                # Zápasy: Rok, Deň, Zápas, Formát, Lefties, Righties, Víťaz
-                if not sheet_games.empty:
-                    cols = [c for c in ["Rok","Deň","Zápas","Formát","Lefties","Righties","Víťaz"] if c in sheet_games.columns]
-                    if cols:
-                        sheet_games = sheet_games[cols]
+            if xlsx_data is not None:
+                st.session_state[xlsx_state_key] = (xlsx_name, xlsx_data)
 
-                # Export do pamäte
-                buffer = io.BytesIO()
-                with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
-                    _write_sheet_auto_fit(writer, sheet_left,  f"Team Lefties {year}")
-                    _write_sheet_auto_fit(writer, sheet_right, f"Team Righties {year}")
-                    _write_sheet_auto_fit(writer, sheet_games, f"Zápasy {year}")
+        cached_export = st.session_state.get(xlsx_state_key)
+        if cached_export is not None:
+            xlsx_name, xlsx_data = cached_export
+            st.download_button(
+                label=f"⬇️ Export do Excelu ({xlsx_name})",
+                data=xlsx_data,
+                file_name=xlsx_name,
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                use_container_width=True,
+                key=dl_key,
+            )
 
-                st.download_button(
-                    label=f"⬇️ Export do Excelu ({xlsx_name})",
-                    data=buffer.getvalue(),
-                    file_name=xlsx_name,
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                    use_container_width=True,
-                    key=f"dl_xlsx_{year}",
-                )
-            except Exception as _ex:
-                st.warning(f"Export do Excelu sa nepodaril: {type(_ex).__name__}: {_ex}")
-                
-            
-            photo_url = str(t.get('Photo', '')).strip()
-            if photo_url:
-                st.image(photo_url,  width=800)
-            #     st.image(photo_url,  use_container_width=True)
-            st.markdown("")
+
+    photo_url = t.get('Photo', '')
+    photo_url = photo_url.strip() if isinstance(photo_url, str) else ''
+    if photo_url:
+        try:
+            photo = _fetch_photo(photo_url)
+        except Exception:
+            photo = None  # zlyhanie sa necachuje – ďalší rerun skúsi znova; teraz ukáž fotku cez URL
+        st.image(photo if photo is not None else photo_url, width=800)
+    #     st.image(photo_url,  use_container_width=True)
+    st.markdown("")
+
+
+# *****************************
+# Turnaje
+# *****************************
+if active_tab == "Turnaje":
+    st.subheader("Turnaje")
+
+    # Jeden selectbox namiesto tlačidla pre každý rok – strom komponentov má O(1) prvkov,
+    # ťažký panel sa vykreslí len pre vybraný turnaj
+    records_by_year = _tournaments_by_year(df_tournaments, df_matches)
+    if st.session_state.get('open_year') not in records_by_year:
+        st.session_state['open_year'] = None
+
+    year = st.selectbox(
+        "Turnaj",
+        [None, *records_by_year],
+        key='open_year',
+        format_func=lambda y: "— vyber turnaj —" if y is None else records_by_year[y]['__label'],
+    )
+    if year is not None:
+        _render_year_panel(year)
 
 
 
@@ -2567,33 +2783,31 @@ with tab_turnaje:
 # *****************************
 # Filter
 # *****************************
-with tab_filter:
+if active_tab == "Filter":
     st.subheader("Filter")
-    c1, c2 = st.columns([2, 1])
 
-    with c1:
-        st.markdown("### Turnaje")
-        tournament_items = _build_tournament_items(df_tournaments)
-        st.session_state.setdefault('flt_t_keys', [it['key'] for it in tournament_items])
+    # Formulár: klikanie po checkboxoch nespúšťa rerun, zmeny sa aplikujú až tlačidlom (1 rerun)
+    with st.form("filters"):
+        c1, c2 = st.columns([2, 1])
 
-        # Master
-        st.checkbox("Všetky turnaje", key='flt_t_all', on_change=_toggle_all_tournaments)
+        with c1:
+            st.markdown("### Turnaje")
+            labels = _build_tournament_items(df_tournaments)
 
-        # Deti
-        for item in tournament_items:
-            st.session_state.setdefault(item['key'], True)
-            st.checkbox(item['label'], key=item['key'], on_change=_on_filter_change)
+            # jeden widget namiesto checkboxu na turnaj; hodnotu drží session_state (nastavuje bootstrap)
+            # labely mimo ponuky (napr. po zmene Excelu) by multiselect odmietol
+            st.session_state['flt_tournaments'] = [label for label in st.session_state.get('flt_tournaments', labels) if label in labels]
+            selected_tournaments = st.multiselect("Turnaje", labels, key='flt_tournaments')
+            st.caption(f"Vybrané turnaje: {len(selected_tournaments)}/{len(labels)}")
 
-        selected_tournaments = [it['label'] for it in tournament_items if st.session_state.get(it['key'], False)]
-        st.session_state['flt_tournaments'] = selected_tournaments
-        st.caption(f"Vybrané turnaje: {len(selected_tournaments)}/{len(tournament_items)}")
+        with c2:
+            st.markdown("### Tímy")
+            st.checkbox("Lefties", key='flt_team_lefties')
+            st.checkbox("Righties", key='flt_team_righties')
 
-    with c2:
-        st.markdown("### Tímy")
-        st.checkbox("Lefties", key='flt_team_lefties', on_change=_on_filter_change)
-        st.checkbox("Righties", key='flt_team_righties', on_change=_on_filter_change)
-
-        st.markdown("### Formáty hry")
-        st.checkbox("Foursome", key='flt_fmt_foursome', on_change=_on_filter_change)
-        st.checkbox("Fourball", key='flt_fmt_fourball', on_change=_on_filter_change)
-        st.checkbox("Single", key='flt_fmt_single', on_change=_on_filter_change)
+            st.markdown("### Formáty hry")
+            st.checkbox("Foursome", key='flt_fmt_foursome')
+            st.checkbox("Fourball", key='flt_fmt_fourball')
+            st.checkbox("Single", key='flt_fmt_single')
+
+        st.form_submit_button("Použiť filter", on_click=_on_filter_submit)